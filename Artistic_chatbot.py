@@ -2,49 +2,86 @@ import os
 import time
 import json
 import random
-import speech_recognition as sr
+import atexit
 from datetime import datetime
+from monitoring.tracing import tracer, start_metrics_server, start_periodic_dump
+from kiosk.startup import StartupOrchestrator, READY
+from kiosk.tts_cache import TTSCache, load_phrases
+from kiosk.capture import StreamingCapture, GoogleASR, FRAME_SAMPLES, SAMPLE_RATE
+# Heavy modules (speech_recognition, elevenlabs, pydub, faiss, torch,
+# sentence-transformers) are imported inside the start-up tasks below,
+# so they load in parallel in background threads.
+
+# Per-stage latency tracing (spans in the voice loop, RAG and chat modules).
+# When disabled, spans are no-ops and /metrics stays empty.
+TRACING_ENABLED = True
+tracer.enabled = TRACING_ENABLED
+# Snapshot of the latency histograms, rewritten every minute while tracing is on.
+METRICS_DUMP_PATH = os.path.join("logs", "metrics.json")
+
 # -------------------------------
-# ElevenLabs TTS using the Python Client
+# API Keys (checked before anything heavy is loaded)
 # -------------------------------
-from elevenlabs.client import ElevenLabs 
-from elevenlabs import play
-
-# Initialize the ElevenLabs client with the API key from the environment.
 eleven_api_key = os.getenv("ELEVENLABS_API_KEY")
 if not eleven_api_key:
     print("Error: ELEVENLABS_API_KEY environment variable not set")
     exit(1)
-eleven_client = ElevenLabs(api_key=eleven_api_key)
 
-def speak_text(text: str, voice_id: str = "f5AWG6Xu8Fw3JCFUVWkS"):
+openai_api_key = os.getenv("OPENAI_API_KEY")
+if not openai_api_key:
+    print("Error: OPENAI_API_KEY environment variable not set")
+    exit(1)
+
+# -------------------------------
+# ElevenLabs TTS using the Python Client
+# -------------------------------
+eleven_client = None  # set once the "tts_client" start-up task has finished
+# Synthesized audio keyed on text and voice options; repeated answers and
+# fixed phrases are played from here without an ElevenLabs call.
+tts_cache = TTSCache(cache_dir=os.path.join("audio", "tts_cache"))
+
+def load_tts_client():
+    from elevenlabs.client import ElevenLabs
+    return ElevenLabs(api_key=eleven_api_key)
+
+def speak_text(text: str, voice_id: str = "f5AWG6Xu8Fw3JCFUVWkS") -> bool:
     """
     Converts the provided text to speech using ElevenLabs and plays the resulting audio.
     Includes voice_settings as specified in the original CURL request.
+    Returns True if the audio was served from the TTS cache.
     """
+    from elevenlabs import play
     try:
-        audio = eleven_client.text_to_speech.convert(
-            text=text,
-            voice_id=voice_id,
-            model_id="eleven_multilingual_v2",
-            output_format="mp3_44100_128",
-            voice_settings={
-                "stability": 0.7,
-                "similarity_boost": 0.7
-            }
-        )
-        play(audio)
+        with tracer.span("tts_synthesize"):
+            audio, cache_hit = tts_cache.synthesize(
+                eleven_client,
+                text,
+                voice_id=voice_id,
+                model_id="eleven_multilingual_v2",
+                output_format="mp3_44100_128",
+                voice_settings={
+                    "stability": 0.7,
+                    "similarity_boost": 0.7
+                }
+            )
+        with tracer.span("tts_play"):
+            play(audio)
+        return cache_hit
     except Exception as e:
         print("Błąd przy generowaniu mowy:", e)
+        return False
+
+def presynthesize_fixed_phrases(tts_client):
+    """Fills the TTS cache with the fixed phrases; only missing ones cost an API call."""
+    return tts_cache.presynthesize(tts_client, load_phrases())
 
 # -------------------------------
 # Random Prompt MP3 Files (played after question is captured)
 # -------------------------------
-from pydub import AudioSegment
-from pydub.playback import play as play_local_audio
-
 # Define the main audio directory
 AUDIO_BASE_DIR = "audio"
+AUDIO_FOLDERS = ["prompts", "greetings", "triggers"]
+AUDIO_BANK = {}  # folder name -> list of (path, decoded AudioSegment)
 
 def load_audio_files_from_folder(folder_name: str) -> list[str]:
     """
@@ -63,50 +100,48 @@ def load_audio_files_from_folder(folder_name: str) -> list[str]:
     if not mp3_files:
         print(f"Warning: No .mp3 files found in {folder_path}")
     return mp3_files
-    
-print("Loading audio files...")
-PROMPT_MP3_FILES = load_audio_files_from_folder("prompts")
-GREETING_MP3_FILES = load_audio_files_from_folder("greetings")
-# We load triggers into a list for consistency, even if there's only one.
-QUESTION_TRIGGER_FILES = load_audio_files_from_folder("triggers")
-print("Audio files loaded.")
 
-def play_random_prompt():
-    """Plays one randomly chosen prompt MP3 file from the loaded list."""
-    if not PROMPT_MP3_FILES:
-        print("Error: No prompt files found or loaded.")
+def load_audio_bank() -> dict:
+    """
+    Decodes every prompt, greeting and trigger MP3 once, so playback
+    does not pay the MP3 decoding cost on each turn.
+    """
+    from pydub import AudioSegment
+    bank = {}
+    for folder_name in AUDIO_FOLDERS:
+        bank[folder_name] = []
+        for path in load_audio_files_from_folder(folder_name):
+            try:
+                bank[folder_name].append((path, AudioSegment.from_mp3(path)))
+            except Exception as e:
+                print(f"Błąd przy wczytywaniu pliku {path}: {e}")
+    return bank
+
+def play_random_from_bank(folder_name: str):
+    """Plays one randomly chosen, already decoded MP3 file from the given folder."""
+    from pydub.playback import play as play_local_audio
+    entries = AUDIO_BANK.get(folder_name)
+    if not entries:
+        print(f"Error: No {folder_name} files found or loaded.")
         return
-    chosen_file = random.choice(PROMPT_MP3_FILES)
+    # Use random.choice so you can add more files later without changing code.
+    chosen_file, audio = random.choice(entries)
     try:
-        audio = AudioSegment.from_mp3(chosen_file)
         play_local_audio(audio)
     except Exception as e:
         print(f"Błąd przy odtwarzaniu pliku {chosen_file}: {e}")
 
+def play_random_prompt():
+    """Plays one randomly chosen prompt MP3 file from the loaded list."""
+    play_random_from_bank("prompts")
+
 def play_greeting():
     """Plays one randomly chosen greeting MP3 file from the loaded list."""
-    if not GREETING_MP3_FILES:
-        print("Error: No greeting files found or loaded.")
-        return
-    chosen_file = random.choice(GREETING_MP3_FILES)
-    try:
-        audio = AudioSegment.from_mp3(chosen_file)
-        play_local_audio(audio)
-    except Exception as e:
-        print(f"Błąd przy odtwarzaniu pliku {chosen_file}: {e}")
+    play_random_from_bank("greetings")
 
 def play_question_trigger():
     """Plays a question trigger MP3 file from the loaded list."""
-    if not QUESTION_TRIGGER_FILES:
-        print("Error: No question trigger files found or loaded.")
-        return
-    # Use random.choice so you can add more trigger files later without changing code.
-    chosen_file = random.choice(QUESTION_TRIGGER_FILES)
-    try:
-        audio = AudioSegment.from_mp3(chosen_file)
-        play_local_audio(audio)
-    except Exception as e:
-        print(f"Błąd przy odtwarzaniu pliku {chosen_file}: {e}")
+    play_random_from_bank("triggers")
 
 # -------------------------------
 # System Prompt Templates
@@ -164,38 +199,155 @@ def choose_system_prompt():
 # -------------------------------
 # RAG & Chat System Initialization
 # -------------------------------
-from RETRIEVAL_POLISH import RAG
-from chat.polish_art_expert import PolishArtExpertRAG
+txt_dir = os.path.join("data", "txt_translation_polish")
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# Per hardware tier, see benchmarks/quantization_report.py:
+# encoder "fp32" | "int8" | "onnx" | "onnx-int8", index "flat" | "fp16" | "sq8".
+EMBEDDING_PRECISION = "fp32"
+INDEX_TYPE = "flat"
+# The cross-encoder is not used by PolishArtExpertRAG yet; enable to preload it.
+LOAD_RERANKER = False
+# Typical visitor questions, used to warm up the encoder and the FAISS index
+# so the first real question does not pay for lazy initialisation.
+WARMUP_QUERIES = [
+    "Witaj",
+    "Kto jest dziekanem Wydziału Sztuki Mediów?",
+    "Opowiedz mi o wystawie z okazji piętnastolecia wydziału.",
+]
 
-# Load OpenAI API Key for chat.
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    print("Error: OPENAI_API_KEY environment variable not set")
-    exit(1)
+def load_embedding_model():
+    from rag.database import load_encoder
+    return load_encoder(EMBEDDING_MODEL_NAME, device="cpu", precision=EMBEDDING_PRECISION)
 
-txt_dir = os.path.join("data", "txt_translation_polish")
-rag_system = RAG.quickstart(txt_dir)
-art_expert_chat = PolishArtExpertRAG(rag_system, openai_api_key, model="gpt-4o-mini")
-# Override the base system prompt with a randomly chosen template.
-art_expert_chat.base_system_prompt = choose_system_prompt()
+def load_reranker_model():
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder("cross-encoder/ms-marco-MiniLM-L-12-v2", device="cpu")
+
+def build_rag_system(embedding_model, reranker_model=None):
+    from rag.database import PolishRAGSystem
+    rag_system = PolishRAGSystem(data_folder=txt_dir, model=embedding_model, index_type=INDEX_TYPE)
+    rag_system.reranker = reranker_model
+    return rag_system
+
+def warm_up(chat):
+    # Same retrieval path as a real question (metadata filter, MMR, per-source cap).
+    for query in WARMUP_QUERIES:
+        chat._prepare_context(query, num_results=3)
+
+def create_chat(rag_system):
+    from chat.polish_art_expert import PolishArtExpertRAG
+    art_expert_chat = PolishArtExpertRAG(rag_system, openai_api_key, model="gpt-4o-mini")
+    # Override the base system prompt with a randomly chosen template.
+    art_expert_chat.base_system_prompt = choose_system_prompt()
+    return art_expert_chat
 
 # -------------------------------
 # Speech Recognition Setup
 # -------------------------------
-recognizer = sr.Recognizer()
-microphone = sr.Microphone()
+# Trailing silence that ends an utterance. Questions get a longer pause so
+# visitors can think mid-sentence; trigger phrases are short.
+TRIGGER_END_SILENCE = 0.5
+QUESTION_END_SILENCE = 1.0
+
+def setup_microphone():
+    import speech_recognition as sr
+    recognizer = sr.Recognizer()
+    # 30 ms frames at 16 kHz, as required by the voice activity detector.
+    microphone = sr.Microphone(sample_rate=SAMPLE_RATE, chunk_size=FRAME_SAMPLES)
+    # The Google Web Speech API accepts about a minute of audio; the limit only
+    # stops capture if the end of speech is never detected.
+    capture = StreamingCapture(microphone, max_utterance=60.0, recalibrate_every=300.0)
+    print("Detektor mowy:", type(capture.vad).__name__)
+    # Initial noise floor; it is re-calibrated periodically while idle.
+    capture.calibrate()
+    return capture, GoogleASR(recognizer, language="pl-PL")
+
+# -------------------------------
+# Parallel Start-up
+# -------------------------------
+orchestrator = StartupOrchestrator(
+    greeting_requires=["audio_bank", "tts_client", "microphone"],
+    answering_requires=["rag_system", "warmup", "chat"]
+)
+orchestrator.submit("embedding_model", load_embedding_model)
+orchestrator.submit("audio_bank", load_audio_bank)
+orchestrator.submit("tts_client", load_tts_client)
+orchestrator.submit("microphone", setup_microphone)
+orchestrator.submit("tts_phrases", presynthesize_fixed_phrases, deps=["tts_client"])
+if LOAD_RERANKER:
+    orchestrator.submit("reranker_model", load_reranker_model)
+    orchestrator.submit("rag_system", build_rag_system, deps=["embedding_model", "reranker_model"])
+else:
+    orchestrator.submit("rag_system", build_rag_system, deps=["embedding_model"])
+orchestrator.submit("chat", create_chat, deps=["rag_system"])
+orchestrator.submit("warmup", warm_up, deps=["chat"])
+
+# -------------------------------
+# Interaction Log (append-only JSONL, written in the background)
+# -------------------------------
+from monitoring.interaction_log import InteractionLogger
+
+interaction_logger = InteractionLogger(log_dir="logs", fsync_policy="interval")
+atexit.register(interaction_logger.close)
+
+# How long /health stays up after a failed start-up before the process exits.
+FAILED_STARTUP_HEALTH_GRACE = 60.0
 
-# Adjust for ambient noise once.
-with microphone as source:
-    recognizer.adjust_for_ambient_noise(source)
+# Per-stage latency histograms at http://127.0.0.1:9464/metrics,
+# start-up readiness at http://127.0.0.1:9464/health. Started before waiting for
+# the start-up tasks, so "starting" and failed tasks are visible there too.
+metrics_server = None
+try:
+    metrics_server = start_metrics_server(
+        port=9464,
+        health=lambda: {"readiness": orchestrator.readiness, "tasks": orchestrator.status()}
+    )
+except OSError as e:
+    print("Nie udało się uruchomić serwera metryk:", e)
+if TRACING_ENABLED:
+    start_periodic_dump(METRICS_DUMP_PATH, interval=60.0)
+
+print("Ładowanie modeli i plików audio w tle...")
+if not orchestrator.wait_until_can_greet():
+    print("Błąd uruchamiania:", json.dumps(orchestrator.status(), ensure_ascii=False, indent=4))
+    if metrics_server is not None:
+        # Keep /health up for a while so the operator can see which task failed,
+        # then exit so a process supervisor can restart the kiosk.
+        print(f"Stan uruchamiania: http://127.0.0.1:9464/health (przez {FAILED_STARTUP_HEALTH_GRACE:.0f} s).")
+        try:
+            time.sleep(FAILED_STARTUP_HEALTH_GRACE)
+        except KeyboardInterrupt:
+            pass
+    exit(1)
+
+# Already imported by the start-up tasks, so these are free.
+import speech_recognition as sr
+
+AUDIO_BANK = orchestrator.result("audio_bank")
+eleven_client = orchestrator.result("tts_client")
+capture, asr = orchestrator.result("microphone")
+print(f"Gotowy do powitania po {orchestrator.elapsed():.1f} s (stan: {orchestrator.readiness}).")
 print("System gotowy. Nasłuchiwanie wywołania ('Witaj', 'Cześć', 'Mam pytanie', lub 'pytanie')...")
 
-def listen_for_trigger(recognizer, microphone):
-    with microphone as source:
-        print("Nasłuchiwanie wywołania ('Witaj', 'Cześć', 'Mam pytanie', lub 'pytanie')...")
-        audio = recognizer.listen(source)
+def get_art_expert_chat():
+    """
+    Returns the chat system, waiting for the RAG warm-up if a visitor
+    asks a question before it has finished. Returns None if start-up failed.
+    """
+    if orchestrator.readiness != READY:
+        print("Kończę przygotowanie bazy wiedzy...")
+    if not orchestrator.wait_until_ready():
+        print("Błąd uruchamiania:", json.dumps(orchestrator.status(), ensure_ascii=False, indent=4))
+        return None
+    return orchestrator.result("chat")
+
+def listen_for_trigger(capture, asr):
+    print("Nasłuchiwanie wywołania ('Witaj', 'Cześć', 'Mam pytanie', lub 'pytanie')...")
+    with tracer.span("listen_trigger"):
+        capture.capture(asr, end_silence=TRIGGER_END_SILENCE)
     try:
-        text = recognizer.recognize_google(audio, language="pl-PL")
+        with tracer.span("asr_trigger"):
+            text = asr.finish()
         print("Usłyszano:", text)
         text_lower = text.lower()
         if "mam pytanie" in text_lower or "pytanie" in text_lower:
@@ -211,13 +363,13 @@ def listen_for_trigger(recognizer, microphone):
         print("Błąd usługi rozpoznawania mowy: {0}".format(e))
         return None, None
 
-def listen_for_question(recognizer, microphone):
-    with microphone as source:
-        print("Proszę, zadaj pytanie...")
-        audio = recognizer.listen(source)
-        recognizer.pause_threshold = 1.5  # 1.5 seconds of silence threshold
+def listen_for_question(capture, asr):
+    print("Proszę, zadaj pytanie...")
+    with tracer.span("listen_question"):
+        capture.capture(asr, end_silence=QUESTION_END_SILENCE, recalibrate=False)
     try:
-        question = recognizer.recognize_google(audio, language="pl-PL")
+        with tracer.span("asr_question"):
+            question = asr.finish()
         print("Twoje pytanie:", question)
         return question
     except sr.UnknownValueError:
@@ -229,31 +381,13 @@ def listen_for_question(recognizer, microphone):
         speak_text("Błąd usługi rozpoznawania mowy")
         return None
 
-def save_log_entry_to_file(entry: dict, log_dir: str = "logs"):
-    """
-    Saves the log entry to a JSON file.
-    The filename is based on the current timestamp.
-    """
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    # Format timestamp as YYYYMMDD_HHMMSS for file naming.
-    timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_name = f"chat_{timestamp_str}.json"
-    file_path = os.path.join(log_dir, file_name)
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(entry, f, ensure_ascii=False, indent=4)
-        print(f"Log zapisany do: {file_path}")
-    except Exception as e:
-        print("Błąd przy zapisywaniu logu:", e)
-
 # -------------------------------
 # Main Loop
 # -------------------------------
 while True:
     try:
         # Listen for a trigger phrase.
-        trigger, _ = listen_for_trigger(recognizer, microphone)
+        trigger, _ = listen_for_trigger(capture, asr)
         if trigger is None:
             print("Brak rozpoznanego wywołania. Ignoruję i ponawiam nasłuchiwanie.")
             time.sleep(0.1)
@@ -267,8 +401,11 @@ while True:
             print("Wykryto 'Mam pytanie' lub 'pytanie'. Odpowiadam.")
             play_question_trigger()
 
+        # Collect per-stage latencies of this Q/A turn for the log.
+        tracer.start_turn()
+
         # Listen for the follow-up question.
-        question = listen_for_question(recognizer, microphone)
+        question = listen_for_question(capture, asr)
         if not question:
             print("Brak pytania. Ignoruję i ponawiam nasłuchiwanie.")
             time.sleep(0.1)
@@ -285,7 +422,14 @@ while True:
 
         # Play a random prompt MP3 file AFTER the question is captured,
         # before generating and reading out the answer.
-        play_random_prompt()
+        with tracer.span("prompt_audio"):
+            play_random_prompt()
+
+        art_expert_chat = get_art_expert_chat()
+        if art_expert_chat is None:
+            speak_text("Przepraszam, baza wiedzy jest niedostępna")
+            tracer.end_turn()
+            continue
 
         # Pass the valid question to your FAISS-based RAG system.
         response_details = art_expert_chat.get_response(
@@ -297,16 +441,20 @@ while True:
         print("Odpowiedź asystenta:", assistant_response)
 
         # Read the answer out loud using ElevenLabs TTS.
-        speak_text(assistant_response)
+        tts_cache_hit = speak_text(assistant_response)
+        latencies = tracer.end_turn()
 
         log_entry = {
             "timestamp": datetime.now().isoformat(),
             "input": question,
             "chosen_style": art_expert_chat.base_system_prompt,
-            "response": assistant_response
+            "response": assistant_response,
+            "latencies": latencies,
+            "fragment_ids": response_details.get("fragment_ids", []),
+            "cache_hits": {"tts": tts_cache_hit}
         }
-        # Save the log entry to a file (each Q/A pair is a separate JSON file).
-        save_log_entry_to_file(log_entry)
+        # Queue the log entry; it is appended to the current JSONL segment in the background.
+        interaction_logger.log(log_entry)
         print(json.dumps(log_entry, ensure_ascii=False, indent=4) + "\n")
         
         time.sleep(0.1)
@@ -0,0 +1,281 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from benchmarks.fakes import FakeRecognizer, FakeOpenAIClient, FakeElevenLabs
+from kiosk.tts_cache import TTSCache
+from monitoring.tracing import tracer
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Lower is better for latency/memory, higher is better for recall.
+LOWER_IS_BETTER = ("time_to_first_audio", "turn_time", "memory")
+
+
+def load_questions(questions_path: Optional[str], audio_dir: Optional[str]) -> List[Dict]:
+    """
+    Load the labelled question set.
+
+    questions_path: JSON list of {"question": str, "audio": optional WAV path
+                    (relative to the JSON file), "relevant": [source filenames]}
+    audio_dir:      directory of recorded questions; each `x.wav` needs an `x.txt`
+                    transcript next to it (no relevance labels).
+    """
+    items = []
+    if questions_path:
+        base = os.path.dirname(os.path.abspath(questions_path))
+        with open(questions_path, encoding="utf-8") as f:
+            for entry in json.load(f):
+                audio = entry.get("audio")
+                items.append({
+                    "question": entry["question"],
+                    "audio": os.path.join(base, audio) if audio else None,
+                    "relevant": entry.get("relevant", []),
+                })
+    if audio_dir:
+        for name in sorted(os.listdir(audio_dir)):
+            if not name.lower().endswith(".wav"):
+                continue
+            transcript_path = os.path.join(audio_dir, os.path.splitext(name)[0] + ".txt")
+            if not os.path.exists(transcript_path):
+                print(f"Warning: no transcript for {name}, skipping")
+                continue
+            with open(transcript_path, encoding="utf-8") as f:
+                items.append({
+                    "question": f.read().strip(),
+                    "audio": os.path.join(audio_dir, name),
+                    "relevant": [],
+                })
+    return items
+
+
+def rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def distribution(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+    n = len(values)
+    return {
+        "mean": sum(values) / n,
+        "p50": values[int(0.50 * (n - 1))],
+        "p95": values[int(0.95 * (n - 1))],
+        "max": values[-1],
+    }
+
+
+def recall_at_k(results: List[Dict], relevant: List[str], k: int) -> float:
+    """Fraction of the relevant source files present among the top-k retrieved chunks."""
+    retrieved = {r.get("metadata", {}).get("filename") for r in results[:k]}
+    return sum(1 for name in relevant if name in retrieved) / len(relevant)
+
+
+def run_turn(item: Dict, recognizer: FakeRecognizer, chat, tts: FakeElevenLabs, tts_cache: TTSCache,
+             prompt_duration: float = 2.0, speech_rate: float = 14.0) -> Dict:
+    """
+    Replays one question through ASR -> RAG + LLM -> TTS, mirroring the main loop
+    of Artistic_chatbot.py. Timing starts when the visitor stops speaking.
+    Like speak_text, the answer is synthesized through the TTS cache and playback
+    can only start once the whole audio is available, so that is the first audio.
+
+    Playback is not performed but accounted for: the prompt clip played before
+    retrieval lasts `prompt_duration` seconds and the answer is read out at
+    `speech_rate` characters per second; turn_time ends when the answer has been read.
+    """
+    tracer.start_turn()
+    start = time.perf_counter()
+    with tracer.span("asr_question"):
+        question = recognizer.recognize_google(item["audio"] or item["question"], language="pl-PL")
+    if question != item["question"]:
+        raise ValueError(f"ASR replay returned {question!r} instead of the transcript {item['question']!r}")
+    tracer.record("prompt_audio", prompt_duration)
+    response_details = chat.get_response(user_query=question, conversation_history=[], temperature=0.7)
+    with tracer.span("tts_synthesize"):
+        _, cache_hit = tts_cache.synthesize(
+            tts,
+            response_details["assistant_response"],
+            voice_id="benchmark",
+            model_id="eleven_multilingual_v2",
+            output_format="mp3_44100_128",
+            voice_settings={"stability": 0.7, "similarity_boost": 0.7}
+        )
+    first_audio = time.perf_counter() - start + prompt_duration
+    playback = len(response_details["assistant_response"]) / speech_rate
+    tracer.record("tts_play", playback)
+    return {
+        "time_to_first_audio": first_audio,
+        "turn_time": first_audio + playback,
+        "tts_cache_hit": cache_hit,
+        "stages": tracer.end_turn(),
+    }
+
+
+def run_benchmark(args) -> Dict:
+    from rag.database import PolishRAGSystem
+    from chat.polish_art_expert import PolishArtExpertRAG
+
+    items = load_questions(args.questions, args.audio_dir)
+    if not items:
+        raise ValueError("No questions to replay. Pass --questions and/or --audio-dir.")
+
+    start = time.perf_counter()
+    rag_system = PolishRAGSystem(data_folder=args.corpus)
+    startup = time.perf_counter() - start
+    rss_after_load = rss_mb()
+
+    chat = PolishArtExpertRAG(rag_system, openai_api_key="benchmark")
+    chat.client = FakeOpenAIClient(latency=args.llm_latency)
+    # Recorded questions are "recognized" as their transcripts.
+    transcripts = {item["audio"]: item["question"] for item in items if item["audio"]}
+    recognizer = FakeRecognizer(transcripts, latency=args.asr_latency)
+    tts = FakeElevenLabs(first_chunk_latency=args.tts_latency)
+    # A fresh cache per run: the first answer to each question is a miss,
+    # repeated answers (--repeat > 1) are hits, as on the kiosk.
+    cache_dir = tempfile.TemporaryDirectory(prefix="tts_cache_")
+    tts_cache = TTSCache(cache_dir=cache_dir.name)
+
+    ks = sorted(set(args.k))
+    # "recall" retrieves with the chat's own settings (filters, MMR, per-source cap),
+    # i.e. the fragments the LLM actually gets; "recall_plain" is nearest-neighbour search.
+    recalls = {k: [] for k in ks}
+    plain_recalls = {k: [] for k in ks}
+    turns = []
+    for _ in range(args.repeat):
+        for item in items:
+            if item["relevant"]:
+                results = rag_system.search(item["question"], top_k=max(ks))
+                for k in ks:
+                    plain_recalls[k].append(recall_at_k(results, item["relevant"], k))
+                    # MMR picks depend on top_k, so retrieve once per cut-off.
+                    results_as_sent = rag_system.search(
+                        item["question"],
+                        top_k=k,
+                        filters=chat.retrieval_filters,
+                        diversify=chat.diversify,
+                        max_per_source=chat.max_fragments_per_source
+                    )
+                    recalls[k].append(recall_at_k(results_as_sent, item["relevant"], k))
+            # get_response prints the whole prompt; keep the report readable.
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                turns.append(run_turn(item, recognizer, chat, tts, tts_cache,
+                                      prompt_duration=args.prompt_duration, speech_rate=args.speech_rate))
+    cache_dir.cleanup()
+
+    stage_names = sorted({name for turn in turns for name in turn["stages"]})
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "config": {
+            "corpus": args.corpus,
+            "retrieval": {
+                "filters": repr(chat.retrieval_filters),
+                "diversify": chat.diversify,
+                "max_fragments_per_source": chat.max_fragments_per_source,
+            },
+            "chunks": len(rag_system.documents),
+            "questions": len(items),
+            "repeat": args.repeat,
+            "asr_latency": args.asr_latency,
+            "llm_latency": args.llm_latency,
+            "tts_latency": args.tts_latency,
+            "prompt_duration": args.prompt_duration,
+            "speech_rate": args.speech_rate,
+        },
+        "startup_seconds": startup,
+        "time_to_first_audio": distribution([t["time_to_first_audio"] for t in turns]),
+        "turn_time": distribution([t["turn_time"] for t in turns]),
+        "stages": {
+            name: distribution([t["stages"][name] for t in turns if name in t["stages"]])
+            for name in stage_names
+        },
+        "tts_cache_hit_rate": sum(t["tts_cache_hit"] for t in turns) / len(turns),
+        "recall": {f"@{k}": (sum(v) / len(v) if v else None) for k, v in recalls.items()},
+        "recall_plain": {f"@{k}": (sum(v) / len(v) if v else None) for k, v in plain_recalls.items()},
+        "memory": {"rss_after_load_mb": rss_after_load, "peak_rss_mb": rss_mb()},
+    }
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, tolerance: float, recall_tolerance: float) -> List[str]:
+    """Return a list of regressions of `report` with respect to `baseline`."""
+    regressions = []
+    for section in LOWER_IS_BETTER:
+        for key, old in (baseline.get(section) or {}).items():
+            new = (report.get(section) or {}).get(key)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            print(f"{section}.{key:<18} {old:10.3f} -> {new:10.3f}  ({change:+.1%})")
+            if new > old * (1 + tolerance):
+                regressions.append(f"{section}.{key} regressed by {change:+.1%}")
+    for section in ("recall", "recall_plain"):
+        for key, old in (baseline.get(section) or {}).items():
+            new = (report.get(section) or {}).get(key)
+            if old is None or new is None:
+                continue
+            print(f"{section + key:<24} {old:10.3f} -> {new:10.3f}  ({new - old:+.3f})")
+            if new < old - recall_tolerance:
+                regressions.append(f"{section}{key} dropped from {old:.3f} to {new:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline end-to-end benchmark of the voice pipeline')
+    parser.add_argument('--corpus', type=str, default=os.path.join("data", "txt_translation_polish"),
+                        help='Directory of .txt documents to index')
+    parser.add_argument('--questions', type=str, help='Labelled question set (JSON)')
+    parser.add_argument('--audio-dir', type=str, help='Directory of recorded question WAVs with .txt transcripts')
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 3, 5, 10], help='Cut-offs for recall@k')
+    parser.add_argument('--repeat', type=int, default=1, help='Number of passes over the question set')
+    parser.add_argument('--asr-latency', type=float, default=0.6, help='Simulated Google ASR latency (s)')
+    parser.add_argument('--llm-latency', type=float, default=1.5, help='Simulated OpenAI latency (s)')
+    parser.add_argument('--tts-latency', type=float, default=0.4, help='Simulated ElevenLabs first-chunk latency (s)')
+    parser.add_argument('--prompt-duration', type=float, default=2.0,
+                        help='Length of the prompt clip played before retrieval (s)')
+    parser.add_argument('--speech-rate', type=float, default=14.0,
+                        help='Characters per second at which the answer is read out')
+    parser.add_argument('--output', type=str, help='Write the report to this JSON file')
+    parser.add_argument('--baseline', type=str, help='Compare against a previously saved report')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Allowed relative latency/memory regression against the baseline')
+    parser.add_argument('--recall-tolerance', type=float, default=0.02,
+                        help='Allowed absolute recall drop against the baseline')
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Report saved to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.tolerance, args.recall_tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,99 @@
+# Local stand-ins for the external services used by the voice loop
+# (Google ASR, OpenAI chat completions, ElevenLabs TTS).
+# Each fake sleeps for a configurable latency so that benchmark timings
+# have the same shape as the real pipeline without network access.
+import os
+import time
+import wave
+import zlib
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+
+
+def wav_duration(path: str) -> float:
+    """Duration of a PCM WAV file in seconds."""
+    with wave.open(path, "rb") as w:
+        return w.getnframes() / float(w.getframerate())
+
+
+class FakeRecognizer:
+    def __init__(self, transcripts: Dict[str, str], latency: float = 0.6, realtime_factor: float = 0.1):
+        """
+        Replaces `recognizer.recognize_google`.
+        `transcripts` maps an audio file name (or the question text itself) to its transcript.
+        Simulated latency = latency + realtime_factor * audio duration.
+        """
+        self.transcripts = transcripts
+        self.latency = latency
+        self.realtime_factor = realtime_factor
+        self.calls = 0
+
+    def recognize_google(self, audio: str, language: str = "pl-PL") -> str:
+        self.calls += 1
+        duration = 0.0
+        if os.path.isfile(audio) and audio.lower().endswith(".wav"):
+            duration = wav_duration(audio)
+        time.sleep(self.latency + self.realtime_factor * duration)
+        key = os.path.basename(audio)
+        return self.transcripts.get(key, self.transcripts.get(audio, audio))
+
+
+class _FakeCompletions:
+    def __init__(self, owner: "FakeOpenAIClient"):
+        self.owner = owner
+
+    def create(self, model: str, messages: List[Dict], temperature: float = 0.7, max_tokens: int = 0, **kwargs):
+        owner = self.owner
+        owner.calls += 1
+        owner.last_messages = messages
+        prompt_words = sum(len(m["content"].split()) for m in messages)
+        time.sleep(owner.latency + owner.seconds_per_prompt_word * prompt_words)
+        content = " ".join(["To jest przykładowa odpowiedź na pytanie o sztukę."] * max(1, owner.answer_sentences))
+        # Distinct prompts get distinct answers, so the TTS cache only hits on repeats.
+        content += f" Odpowiedź {zlib.crc32(messages[-1]['content'].encode('utf-8')):08x}."
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeOpenAIClient:
+    def __init__(self, latency: float = 1.5, seconds_per_prompt_word: float = 0.00005, answer_sentences: int = 4):
+        """
+        Replaces `OpenAI(...)` in PolishArtExpertRAG (assign it to `.client`).
+        Latency grows slightly with prompt size, like the real API.
+        """
+        self.latency = latency
+        self.seconds_per_prompt_word = seconds_per_prompt_word
+        self.answer_sentences = answer_sentences
+        self.calls = 0
+        self.last_messages: Optional[List[Dict]] = None
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+
+
+class _FakeTextToSpeech:
+    def __init__(self, owner: "FakeElevenLabs"):
+        self.owner = owner
+
+    def convert(self, text: str, voice_id: str, model_id: str = None, output_format: str = None,
+                voice_settings: Dict = None, **kwargs) -> Iterator[bytes]:
+        owner = self.owner
+        owner.calls += 1
+        owner.characters += len(text)
+        n_chunks = max(1, len(text) // owner.chars_per_chunk)
+        time.sleep(owner.first_chunk_latency)
+        for i in range(n_chunks):
+            if i:
+                time.sleep(owner.chunk_latency)
+            yield b"\x00" * owner.chunk_bytes
+
+
+class FakeElevenLabs:
+    def __init__(self, first_chunk_latency: float = 0.4, chunk_latency: float = 0.05,
+                 chars_per_chunk: int = 200, chunk_bytes: int = 4096):
+        """Replaces the ElevenLabs client; `convert` streams silent chunks."""
+        self.first_chunk_latency = first_chunk_latency
+        self.chunk_latency = chunk_latency
+        self.chars_per_chunk = chars_per_chunk
+        self.chunk_bytes = chunk_bytes
+        self.calls = 0
+        self.characters = 0
+        self.text_to_speech = _FakeTextToSpeech(self)
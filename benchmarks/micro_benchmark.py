@@ -0,0 +1,271 @@
+import gc
+import json
+import time
+import zlib
+import argparse
+import statistics
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.synthetic_corpus import make_corpus, make_chunks
+
+
+class HashingEncoder:
+    def __init__(self, dimension: int = 384):
+        """
+        Offline stand-in for SentenceTransformer: a bag-of-words hashing embedding
+        with the same output shape and dtype as all-MiniLM-L6-v2.
+        """
+        self.dimension = dimension
+
+    def encode(self, texts: List[str], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in text.split():
+                embeddings[row, zlib.crc32(token.encode("utf-8")) % self.dimension] += 1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+
+class OverlapReranker:
+    """Offline stand-in for CrossEncoder.predict: token overlap score per (query, text) pair."""
+
+    def predict(self, pairs):
+        scores = []
+        for query, text in pairs:
+            query_tokens = set(query.split())
+            scores.append(sum(1 for token in text.split() if token in query_tokens) / (len(query_tokens) or 1))
+        return np.array(scores, dtype=np.float32)
+
+
+def benchmark(fn: Callable, min_time: float = 0.5, max_rounds: int = 200, warmup: int = 1,
+              items: int = 1, measure_memory: bool = True) -> Dict:
+    """
+    Time `fn` in the style of pytest-benchmark: warm-up calls, then repeated rounds
+    until `min_time` has elapsed. `items` is the amount of work per call, used to
+    report throughput. Peak Python/numpy allocation is measured with tracemalloc
+    in a separate call so it does not distort the timings.
+    """
+    for _ in range(warmup):
+        fn()
+    timings = []
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        deadline = time.perf_counter() + min_time
+        while len(timings) < max_rounds and (len(timings) < 3 or time.perf_counter() < deadline):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    peak_memory = None
+    if measure_memory:
+        tracemalloc.start()
+        fn()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        "rounds": len(timings),
+        "min": min(timings),
+        "mean": statistics.mean(timings),
+        "median": median,
+        "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "throughput": items / median if median > 0 else None,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def make_rag_system(real_models: bool, index_type: str = "flat", dimension: int = 384):
+    from rag.database import PolishRAGSystem
+
+    if real_models:
+        rag_system = PolishRAGSystem(index_type=index_type)
+        rag_system.load_reranker()
+    else:
+        rag_system = PolishRAGSystem(model=HashingEncoder(dimension), index_type=index_type)
+        rag_system.reranker = OverlapReranker()
+    return rag_system
+
+
+def fill_index(rag_system, n_chunks: int, chunk_texts: List[str], seed: int = 0):
+    """
+    Fill the index with `n_chunks` random unit vectors directly, so large index
+    sizes can be benchmarked without encoding millions of texts.
+    """
+    dimension = rag_system.model.encode(["x"], convert_to_numpy=True).shape[1]
+    rag_system.dimension = dimension
+    rag_system.index = rag_system._create_index()
+    rng = np.random.default_rng(seed)
+    batch = 100_000
+    for start in range(0, n_chunks, batch):
+        vectors = rng.standard_normal((min(batch, n_chunks - start), dimension), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        if not rag_system.index.is_trained:
+            rag_system.index.train(vectors)
+        rag_system.index.add(vectors)
+    rag_system.documents = [chunk_texts[i % len(chunk_texts)] for i in range(n_chunks)]
+    # Four in five chunks Polish, so a language filter has to scan and select.
+    rag_system.metadata = [
+        {"filename": f"doc_{i % 1000}.txt", "source": f"doc_{i % 1000}", "language": "en" if i % 5 == 0 else "pl"}
+        for i in range(n_chunks)
+    ]
+
+
+def index_bytes(index) -> int:
+    code_size = getattr(index, "code_size", None) or index.d * 4
+    return int(code_size) * index.ntotal
+
+
+def run_suite(args) -> Dict[str, Dict]:
+    results = {}
+    rag_system = make_rag_system(args.real_models, args.index_type)
+
+    def record(name: str, stats: Dict):
+        results[name] = stats
+        throughput = f"{stats['throughput']:,.1f}/s" if stats["throughput"] else "-"
+        memory = f"{stats['peak_memory_bytes'] / 1e6:.1f} MB" if stats.get("peak_memory_bytes") is not None else "-"
+        print(f"{name:<32} median {stats['median'] * 1000:9.3f} ms   {throughput:>14}   peak {memory}")
+
+    # split_text: chunking of whole documents (throughput in MB of text per second)
+    corpus = make_corpus(args.documents, words_per_document=args.words_per_document, seed=args.seed)
+    corpus_mb = sum(len(doc.encode("utf-8")) for doc in corpus) / 1e6
+    record("split_text", benchmark(
+        lambda: [rag_system.split_text(doc, rag_system.chunk_max_size, rag_system.chunk_overlap) for doc in corpus],
+        items=corpus_mb,
+    ))
+
+    # add_documents: encode + index insert (throughput in chunks per second)
+    chunks = make_chunks(args.add_chunks, seed=args.seed)
+    metadata = [{"filename": f"doc_{i}.txt"} for i in range(len(chunks))]
+
+    def add_documents():
+        rag_system.index = None
+        rag_system.documents = []
+        rag_system.metadata = []
+        rag_system.add_documents(chunks, metadata)
+
+    record("add_documents", benchmark(add_documents, items=len(chunks), min_time=args.min_time))
+
+    # search latency by index size: plain nearest neighbours, with a metadata
+    # pre-filter, and with MMR + per-source cap as PolishArtExpertRAG retrieves
+    queries = make_chunks(32, words_per_chunk=12, seed=args.seed + 1)
+    search_variants = {
+        "search": {},
+        "search_filtered": {"filters": {"language": "pl"}},
+        "search_mmr": {"diversify": True, "max_per_source": 2},
+    }
+    for size in args.sizes:
+        fill_index(rag_system, size, chunks, seed=args.seed)
+        for name, options in search_variants.items():
+            position = [0]
+
+            def search():
+                query = queries[position[0] % len(queries)]
+                position[0] += 1
+                rag_system.search(query, top_k=args.top_k, **options)
+
+            stats = benchmark(search, min_time=args.min_time, measure_memory=False)
+            stats["index_bytes"] = index_bytes(rag_system.index)
+            record(f"{name}[{size}]", stats)
+
+    # rerank latency by candidate count
+    fill_index(rag_system, max(args.candidates), chunks, seed=args.seed)
+    for n_candidates in args.candidates:
+        candidates = rag_system.search(queries[0], top_k=n_candidates)
+        record(f"rerank[{n_candidates}]", benchmark(
+            lambda: rag_system.rerank(queries[0], candidates, top_k=3),
+            items=n_candidates, min_time=args.min_time,
+        ))
+
+    # _prepare_context: retrieval + fragment formatting + whitespace truncation
+    from chat.polish_art_expert import PolishArtExpertRAG
+
+    chat = PolishArtExpertRAG(rag_system, openai_api_key="benchmark")
+    record("prepare_context", benchmark(
+        lambda: chat._prepare_context(queries[1], num_results=3, token_limit=16000),
+        min_time=args.min_time,
+    ))
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float, memory_tolerance: float) -> List[str]:
+    """Return the benchmarks whose median time or peak memory regressed beyond the tolerances."""
+    regressions = []
+    print(f"\n{'benchmark':<32} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, old in baseline.items():
+        new = results.get(name)
+        if new is None:
+            continue
+        change = new["median"] / old["median"] - 1
+        print(f"{name:<32} {old['median'] * 1000:10.3f}ms {new['median'] * 1000:10.3f}ms {change:+8.1%}")
+        if change > tolerance:
+            regressions.append(f"{name}: median time {change:+.1%}")
+        for key in ("peak_memory_bytes", "index_bytes"):
+            old_mem, new_mem = old.get(key), new.get(key)
+            if old_mem and new_mem and new_mem > old_mem * (1 + memory_tolerance):
+                regressions.append(f"{name}: {key} {new_mem / old_mem - 1:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for the retrieval core (PolishRAGSystem)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help='Index sizes for the search benchmark (e.g. add 1000000)')
+    parser.add_argument('--candidates', type=int, nargs='+', default=[5, 10, 25, 50, 100],
+                        help='Candidate counts for the rerank benchmark')
+    parser.add_argument('--documents', type=int, default=20, help='Synthetic documents for split_text')
+    parser.add_argument('--words-per-document', type=int, default=20_000)
+    parser.add_argument('--add-chunks', type=int, default=1_000, help='Chunks per add_documents call')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.5, help='Minimum measured time per benchmark (s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--index-type', type=str, default='flat', choices=['flat', 'fp16', 'sq8'],
+                        help='FAISS vector storage used by PolishRAGSystem')
+    parser.add_argument('--real-models', action='store_true',
+                        help='Use the real SentenceTransformer and CrossEncoder instead of offline stand-ins')
+    parser.add_argument('--save', type=str, help='Save results to this JSON file')
+    parser.add_argument('--compare', type=str, help='Compare against saved results and fail on regression')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative slowdown of the median')
+    parser.add_argument('--memory-tolerance', type=float, default=0.10, help='Allowed relative memory growth')
+    args = parser.parse_args()
+
+    results = run_suite(args)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": datetime.now().isoformat(), "real_models": args.real_models,
+                       "index_type": args.index_type, "results": results}, f, indent=2)
+        print(f"Results saved to: {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("real_models") != args.real_models:
+            print("Warning: baseline was recorded with a different --real-models setting")
+        baseline_index_type = baseline.get("index_type", "flat")
+        if baseline_index_type != args.index_type:
+            # Search timings and index sizes of different storage types are not comparable.
+            print(f"Error: baseline was recorded with --index-type {baseline_index_type}, "
+                  f"this run used {args.index_type}; not comparing")
+            return 1
+        regressions = compare(results, baseline["results"], args.tolerance, args.memory_tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
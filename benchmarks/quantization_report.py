@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import argparse
+import statistics
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.micro_benchmark import HashingEncoder, index_bytes
+from benchmarks.synthetic_corpus import make_chunks
+
+
+def load_corpus_chunks(corpus_dir: str, max_chunks: int) -> Tuple[List[str], List[str]]:
+    """Chunk the .txt documents as PolishRAGSystem does; returns (chunks, source filename per chunk)."""
+    from rag.database import PolishRAGSystem
+
+    splitter = PolishRAGSystem(model=HashingEncoder())
+    chunks, filenames = [], []
+    for name in sorted(os.listdir(corpus_dir)):
+        if not name.endswith(".txt"):
+            continue
+        with open(os.path.join(corpus_dir, name), encoding="utf-8") as f:
+            document_chunks = splitter.split_text(f.read(), splitter.chunk_max_size, splitter.chunk_overlap)
+        chunks.extend(document_chunks)
+        filenames.extend([name] * len(document_chunks))
+        if len(chunks) >= max_chunks:
+            break
+    return chunks[:max_chunks], filenames[:max_chunks]
+
+
+def load_queries(questions_path: str) -> Tuple[List[str], List[List[str]]]:
+    """Questions and their relevant source filenames from an e2e_benchmark question set."""
+    with open(questions_path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return [entry["question"] for entry in entries], [entry.get("relevant", []) for entry in entries]
+
+
+def median_ms(fn, items: List) -> float:
+    timings = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def build_index(rag_system, embeddings: np.ndarray):
+    rag_system.dimension = embeddings.shape[1]
+    rag_system.index = rag_system._create_index()
+    if not rag_system.index.is_trained:
+        rag_system.index.train(embeddings)
+    rag_system.index.add(embeddings)
+
+
+def agreement_with(reference: np.ndarray, found: np.ndarray) -> float:
+    """Mean fraction of the reference top-k ids that the variant also returned."""
+    k = reference.shape[1]
+    return float(np.mean([len(set(ref) & set(hit)) / k for ref, hit in zip(reference, found)]))
+
+
+def labelled_recall(found: np.ndarray, chunk_filenames: List[str], relevant: List[List[str]]) -> Optional[float]:
+    """
+    Mean fraction of the labelled relevant source files present among the top-k
+    chunks (as recall@k in e2e_benchmark). None if no question has labels.
+    """
+    recalls = []
+    for hit, names in zip(found, relevant):
+        if names:
+            retrieved = {chunk_filenames[i] for i in hit if i >= 0}
+            recalls.append(sum(1 for name in names if name in retrieved) / len(names))
+    return float(np.mean(recalls)) if recalls else None
+
+
+def run_report(args) -> List[Dict]:
+    from rag.database import PolishRAGSystem, load_encoder
+
+    chunk_filenames = None
+    if args.corpus:
+        chunks, chunk_filenames = load_corpus_chunks(args.corpus, args.max_chunks)
+    else:
+        chunks = make_chunks(args.max_chunks, seed=args.seed)
+    relevant = []
+    if args.questions:
+        queries, relevant = load_queries(args.questions)
+    else:
+        queries = make_chunks(50, words_per_chunk=10, seed=args.seed + 1)
+    # Accuracy against the relevance labels needs the source of every chunk, i.e. a real corpus.
+    labelled = chunk_filenames is not None and any(relevant)
+    if args.questions and not labelled:
+        print("No relevance labels for this corpus; reporting only agreement with the reference")
+    print(f"{len(chunks)} chunks, {len(queries)} queries")
+
+    if args.offline:
+        encoders = {"hashing": lambda: HashingEncoder()}
+    else:
+        encoders = {
+            precision: (lambda p=precision: load_encoder(args.model_name, "cpu", p))
+            for precision in args.encoders
+        }
+
+    rows = []
+    reference_ids = None
+    reference_query_embeddings = None
+    for precision, load in encoders.items():
+        start = time.perf_counter()
+        try:
+            encoder = load()
+        except Exception as e:
+            print(f"Skipping encoder '{precision}': {e}")
+            continue
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        corpus_embeddings = encoder.encode(chunks, convert_to_numpy=True).astype(np.float32)
+        corpus_seconds = time.perf_counter() - start
+        query_embeddings = encoder.encode(queries, convert_to_numpy=True).astype(np.float32)
+        encode_query_ms = median_ms(lambda q: encoder.encode([q], convert_to_numpy=True), queries)
+
+        # Agreement of the query embeddings with the first (reference) encoder.
+        if reference_query_embeddings is None:
+            reference_query_embeddings = query_embeddings
+        a = query_embeddings / np.linalg.norm(query_embeddings, axis=1, keepdims=True)
+        b = reference_query_embeddings / np.linalg.norm(reference_query_embeddings, axis=1, keepdims=True)
+        cosine_to_reference = float(np.mean(np.sum(a * b, axis=1)))
+
+        for index_type in args.index_types:
+            rag_system = PolishRAGSystem(model=encoder, index_type=index_type)
+            build_index(rag_system, corpus_embeddings)
+            _, ids = rag_system.index.search(query_embeddings, args.k)
+            if reference_ids is None:
+                reference_ids = ids  # first encoder + first index type is the reference
+            search_ms = median_ms(lambda q: rag_system.index.search(q[None, :], args.k), list(query_embeddings))
+            row = {
+                "encoder": precision,
+                "index": index_type,
+                "encoder_load_s": load_seconds,
+                "corpus_encode_chunks_per_s": len(chunks) / corpus_seconds,
+                "query_encode_ms": encode_query_ms,
+                "search_ms": search_ms,
+                "index_mb": index_bytes(rag_system.index) / 1e6,
+                "cosine_to_reference": cosine_to_reference,
+                f"agreement@{args.k}": agreement_with(reference_ids, ids),
+                f"recall@{args.k}": labelled_recall(ids, chunk_filenames, relevant) if labelled else None,
+            }
+            rows.append(row)
+            recall = f"   recall@{args.k} {row[f'recall@{args.k}']:.3f}" if labelled else ""
+            print(f"{precision:<10} {index_type:<5} encode {encode_query_ms:7.2f} ms   search {search_ms:7.3f} ms   "
+                  f"index {row['index_mb']:8.2f} MB   cos {cosine_to_reference:.4f}   "
+                  f"agree@{args.k} {row[f'agreement@{args.k}']:.3f}{recall}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Accuracy vs. speed of encoder quantization and FAISS vector storage settings'
+    )
+    parser.add_argument('--model-name', type=str, default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument('--encoders', type=str, nargs='+', default=["fp32", "int8", "onnx", "onnx-int8"],
+                        help='Encoder precisions to compare; the first one is the reference')
+    parser.add_argument('--index-types', type=str, nargs='+', default=["flat", "fp16", "sq8"],
+                        help='Index types to compare; the first one is the reference')
+    parser.add_argument('--corpus', type=str, help='Directory of .txt documents (default: synthetic chunks)')
+    parser.add_argument('--questions', type=str,
+                        help='JSON question set as used by e2e_benchmark; with --corpus, its "relevant" '
+                             'labels give recall@k')
+    parser.add_argument('--max-chunks', type=int, default=5000)
+    parser.add_argument('--k', type=int, default=3, help='Top-k for recall and agreement with the reference')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--offline', action='store_true',
+                        help='Use the hashing encoder only and compare index types')
+    parser.add_argument('--output', type=str, help='Write the report rows to this JSON file')
+    args = parser.parse_args()
+
+    rows = run_report(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"Report saved to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
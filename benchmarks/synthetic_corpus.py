@@ -0,0 +1,60 @@
+import random
+from itertools import accumulate
+from typing import List
+
+# Syllables and short function words with Polish letter frequencies and diacritics,
+# so chunk lengths and tokenization behave like the real translated corpus.
+SYLLABLES = [
+    "sz", "cz", "prz", "rze", "nie", "sta", "wie", "ko", "ło", "ść", "ja", "ra",
+    "ta", "mi", "ka", "dzie", "wa", "no", "po", "li", "ma", "ży", "ró", "ę",
+    "ą", "zna", "sztu", "ka", "obra", "zy", "wy", "sta", "wa", "ar", "ty", "sty",
+    "mu", "ze", "um", "ga", "le", "ria", "rzeź", "ba", "ma", "lar", "stwo", "ń",
+]
+FUNCTION_WORDS = ["i", "w", "na", "z", "do", "że", "się", "nie", "to", "jest", "o", "jak", "oraz", "przez"]
+
+
+def make_vocabulary(size: int = 5000, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    vocabulary = set()
+    while len(vocabulary) < size:
+        vocabulary.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))))
+    words = sorted(vocabulary)
+    rng.shuffle(words)  # rank in the Zipf distribution should not follow the alphabet
+    return FUNCTION_WORDS + words
+
+
+def zipf_cum_weights(n: int) -> List[float]:
+    return list(accumulate(1.0 / (rank + 1) for rank in range(n)))
+
+
+def make_document(n_words: int, vocabulary: List[str], rng: random.Random, cum_weights: List[float] = None) -> str:
+    """Zipf-distributed words grouped into sentences and paragraphs."""
+    if cum_weights is None:
+        cum_weights = zipf_cum_weights(len(vocabulary))
+    words = rng.choices(vocabulary, cum_weights=cum_weights, k=n_words)
+    parts = []
+    remaining = rng.randint(6, 20)
+    for word in words:
+        remaining -= 1
+        if remaining == 0:
+            word += "."
+            remaining = rng.randint(6, 20)
+            if rng.random() < 0.15:
+                word += "\n\n"
+        parts.append(word)
+    return " ".join(parts)
+
+
+def make_corpus(n_documents: int, words_per_document: int = 2000, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(seed=seed)
+    cum_weights = zipf_cum_weights(len(vocabulary))
+    return [make_document(words_per_document, vocabulary, rng, cum_weights) for _ in range(n_documents)]
+
+
+def make_chunks(n_chunks: int, words_per_chunk: int = 120, seed: int = 0) -> List[str]:
+    """Chunk-sized texts for index/search benchmarks without running split_text."""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(seed=seed)
+    cum_weights = zipf_cum_weights(len(vocabulary))
+    return [make_document(words_per_chunk, vocabulary, rng, cum_weights) for _ in range(n_chunks)]
@@ -1,5 +1,6 @@
 from typing import List, Dict, Optional
 from openai import OpenAI
+from monitoring.tracing import tracer
 
 class PolishArtExpertRAG:
     def __init__(
@@ -7,12 +8,20 @@ class PolishArtExpertRAG:
         rag_system,
         openai_api_key: str,
         model: str = "gpt-4o-mini",
-        max_context_length: int = 40000
+        max_context_length: int = 40000,
+        retrieval_filters: Optional[Dict] = None,
+        diversify: bool = True,
+        max_fragments_per_source: Optional[int] = 2
     ):
         self.rag_system = rag_system
         self.client = OpenAI(api_key=openai_api_key)
         self.model = model
         self.max_context_length = max_context_length
+        # Retrieval options: metadata pre-filter (e.g. {"language": "pl"}) and MMR
+        # diversification, so the fragments are not overlapping windows of one text.
+        self.retrieval_filters = retrieval_filters
+        self.diversify = diversify
+        self.max_fragments_per_source = max_fragments_per_source
 
         self.base_system_prompt = (
             "Jesteś ekspertem w dziedzinie sztuki, który zawsze odpowiada w języku polskim. \n"
@@ -30,12 +39,19 @@ class PolishArtExpertRAG:
             "8. Nazywasz się Art Chat"
         )
 
-    def _prepare_context(self, query: str, num_results: int = 3, token_limit: int = 10000) -> (str, list):
+    def _prepare_context(self, query: str, num_results: int = 3, token_limit: int = 10000) -> (str, list, list):
         # initial_results = self.rag_system.search(query=query, top_k=5, include_metadata=True)
         # Rerank these results using the cross-encoder
-        reranked_results = self.rag_system.search(query=query, top_k=3)  # self.rag_system.rerank(query, initial_results, top_k=num_results)
+        reranked_results = self.rag_system.search(
+            query=query,
+            top_k=num_results,
+            filters=self.retrieval_filters,
+            diversify=self.diversify,
+            max_per_source=self.max_fragments_per_source
+        )  # self.rag_system.rerank(query, initial_results, top_k=num_results)
 
         fragments = []
+        fragment_ids = []
         context_parts = []
         for i, result in enumerate(reranked_results, 1):
             filename = result.get('metadata', {}).get('filename', 'Brak źródła')
@@ -45,21 +61,24 @@ class PolishArtExpertRAG:
             )
             context_parts.append(fragment)
             fragments.append(fragment)
+            fragment_ids.append(result.get('id'))
         full_context = "\n".join(context_parts)
 
         # A very simple tokenization based on whitespace:
         tokens = full_context.split()
         truncated_context = " ".join(tokens[:token_limit]) if len(tokens) > token_limit else full_context
 
-        return truncated_context, fragments
+        return truncated_context, fragments, fragment_ids
 
     def get_response(self, user_query: str, conversation_history: Optional[List[Dict]] = None, temperature: float = 0.7) -> dict:
         """
         Zwraca słownik zawierający:
           - "assistant_response": odpowiedź modelu
           - "fragments": lista fragmentów pobranych z FAISS
+          - "fragment_ids": identyfikatory tych fragmentów w indeksie FAISS
         """
-        truncated_context, fragments = self._prepare_context(user_query, num_results=3, token_limit=16000)
+        with tracer.span("retrieval"):
+            truncated_context, fragments, fragment_ids = self._prepare_context(user_query, num_results=3, token_limit=16000)
         print(truncated_context)
         messages = [
             {
@@ -76,14 +95,15 @@ class PolishArtExpertRAG:
         print(messages)
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=16000
-            )
+            with tracer.span("llm"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=16000
+                )
             assistant_response = response.choices[0].message.content
         except Exception as e:
             assistant_response = f"Przepraszamy, wystąpił błąd: {str(e)}"
 
-        return {"assistant_response": assistant_response, "fragments": fragments}
\ No newline at end of file
+        return {"assistant_response": assistant_response, "fragments": fragments, "fragment_ids": fragment_ids}
\ No newline at end of file
@@ -0,0 +1,213 @@
+import time
+import math
+from array import array
+from collections import deque
+from typing import Optional
+
+try:
+    import webrtcvad
+except ImportError:  # listed in requirements.txt (webrtcvad-wheels); falls back to EnergyVAD
+    webrtcvad = None
+
+# WebRTC VAD accepts 10/20/30 ms frames of 16-bit mono PCM at 8/16/32/48 kHz.
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+
+def frame_rms(frame: bytes) -> float:
+    samples = array("h", frame)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class EnergyVAD:
+    def __init__(self, ratio: float = 3.0, adapt_rate: float = 0.05, min_floor: float = 50.0):
+        """
+        Frame classifier comparing RMS energy with an adaptive noise floor.
+        A frame is speech if its energy exceeds `ratio` times the floor; the
+        floor follows the background level during non-speech frames.
+        """
+        self.ratio = ratio
+        self.adapt_rate = adapt_rate
+        self.min_floor = min_floor
+        self.noise_floor = min_floor
+
+    def is_speech(self, frame: bytes) -> bool:
+        return frame_rms(frame) > self.ratio * self.noise_floor
+
+    def update_noise(self, frame: bytes):
+        energy = frame_rms(frame)
+        self.noise_floor = max(self.min_floor, (1 - self.adapt_rate) * self.noise_floor + self.adapt_rate * energy)
+
+    def calibrate(self, frames: list[bytes]):
+        if frames:
+            energies = sorted(frame_rms(f) for f in frames)
+            # The median ignores short bursts (a cough, a door) during calibration.
+            self.noise_floor = max(self.min_floor, energies[len(energies) // 2])
+
+
+class WebRTCVAD:
+    def __init__(self, aggressiveness: int = 2, sample_rate: int = SAMPLE_RATE, energy_gate: Optional[EnergyVAD] = None):
+        """
+        WebRTC GMM frame classifier. `aggressiveness` is 0 (least) to 3 (most
+        aggressive in rejecting non-speech). The energy gate adds a noise-floor
+        check so steady loud gallery noise is not taken for speech.
+        """
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+        self.energy_gate = energy_gate or EnergyVAD(ratio=1.5)
+
+    def is_speech(self, frame: bytes) -> bool:
+        return self.vad.is_speech(frame, self.sample_rate) and self.energy_gate.is_speech(frame)
+
+    def update_noise(self, frame: bytes):
+        self.energy_gate.update_noise(frame)
+
+    def calibrate(self, frames: list[bytes]):
+        self.energy_gate.calibrate(frames)
+
+    @property
+    def noise_floor(self) -> float:
+        return self.energy_gate.noise_floor
+
+
+def make_vad(aggressiveness: int = 2, sample_rate: int = SAMPLE_RATE):
+    """WebRTC VAD if `webrtcvad` is installed, otherwise the energy-based classifier."""
+    if webrtcvad is not None:
+        return WebRTCVAD(aggressiveness, sample_rate)
+    return EnergyVAD()
+
+
+class GoogleASR:
+    def __init__(self, recognizer, language: str = "pl-PL"):
+        """
+        ASR backend fed incrementally by StreamingCapture.
+        The Google Web Speech API only accepts whole utterances, so chunks are
+        buffered and sent on `finish`; a streaming backend can implement the
+        same begin/feed/finish methods and start decoding while the visitor speaks.
+        """
+        self.recognizer = recognizer
+        self.language = language
+        self._chunks = []
+        self._sample_rate = SAMPLE_RATE
+        self._sample_width = 2
+
+    def begin(self, sample_rate: int, sample_width: int):
+        self._chunks = []
+        self._sample_rate = sample_rate
+        self._sample_width = sample_width
+
+    def feed(self, chunk: bytes):
+        self._chunks.append(chunk)
+
+    def finish(self) -> str:
+        import speech_recognition as sr
+        audio = sr.AudioData(b"".join(self._chunks), self._sample_rate, self._sample_width)
+        self._chunks = []
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+
+class StreamingCapture:
+    def __init__(
+        self,
+        microphone,
+        vad=None,
+        start_frames: int = 4,
+        start_window: int = 6,
+        end_silence: float = 0.8,
+        pre_roll: float = 0.3,
+        max_utterance: float = 15.0,
+        recalibrate_every: float = 300.0,
+        calibration_duration: float = 1.0
+    ):
+        """
+        Frame-by-frame microphone capture with voice activity detection.
+
+        An utterance starts when `start_frames` of the last `start_window` frames
+        are speech and ends after `end_silence` seconds without speech (or after
+        `max_utterance` seconds). `pre_roll` seconds before the onset are kept so
+        the first syllable is not clipped. Every frame of the utterance is passed
+        to the ASR backend as soon as it is read.
+
+        While waiting for speech the noise floor follows the background level,
+        and a full re-calibration runs every `recalibrate_every` seconds, so the
+        detector keeps up with gallery noise changing during the day.
+        The microphone should be created with sample_rate=16000 and
+        chunk_size=480 (30 ms frames).
+        """
+        self.microphone = microphone
+        self.vad = vad or make_vad(sample_rate=getattr(microphone, "SAMPLE_RATE", SAMPLE_RATE))
+        self.start_frames = start_frames
+        self.start_window = start_window
+        self.end_silence = end_silence
+        self.pre_roll = pre_roll
+        self.max_utterance = max_utterance
+        self.recalibrate_every = recalibrate_every
+        self.calibration_duration = calibration_duration
+        self.last_calibration = None
+
+    def calibrate(self, source=None):
+        """Measure the background noise floor (the visitor should not be speaking)."""
+        if source is None:
+            with self.microphone as source:
+                return self.calibrate(source)
+        frame_seconds = source.CHUNK / source.SAMPLE_RATE
+        n_frames = max(1, int(self.calibration_duration / frame_seconds))
+        frames = [source.stream.read(source.CHUNK) for _ in range(n_frames)]
+        self.vad.calibrate(frames)
+        self.last_calibration = time.monotonic()
+
+    def capture(self, asr, timeout: Optional[float] = None, end_silence: Optional[float] = None,
+                recalibrate: bool = True) -> bool:
+        """
+        Wait for one utterance and stream it into `asr` (begin/feed).
+        `end_silence` overrides the trailing silence for this call. Pass
+        `recalibrate=False` when the visitor may start speaking immediately
+        (e.g. right after the "tak, słucham" prompt).
+        Returns False if no speech started within `timeout` seconds.
+        """
+        with self.microphone as source:
+            calibration_due = self.last_calibration is None or time.monotonic() - self.last_calibration > self.recalibrate_every
+            if recalibrate and calibration_due:
+                self.calibrate(source)
+
+            frame_seconds = source.CHUNK / source.SAMPLE_RATE
+            pre_roll = deque(maxlen=max(self.start_window, int(self.pre_roll / frame_seconds)))
+            decisions = deque(maxlen=self.start_window)
+            end_frames = max(1, int((end_silence or self.end_silence) / frame_seconds))
+            max_frames = int(self.max_utterance / frame_seconds)
+            started = time.monotonic()
+
+            # Wait for the onset of speech.
+            while True:
+                if timeout is not None and time.monotonic() - started > timeout:
+                    return False
+                frame = source.stream.read(source.CHUNK)
+                speech = self.vad.is_speech(frame)
+                pre_roll.append(frame)
+                decisions.append(speech)
+                if sum(decisions) >= self.start_frames:
+                    break
+                if not speech:
+                    self.vad.update_noise(frame)
+
+            asr.begin(source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+            for frame in pre_roll:
+                asr.feed(frame)
+
+            # Stream the utterance until enough trailing silence.
+            silent = 0
+            n_frames = len(pre_roll)
+            while n_frames < max_frames:
+                frame = source.stream.read(source.CHUNK)
+                asr.feed(frame)
+                n_frames += 1
+                if self.vad.is_speech(frame):
+                    silent = 0
+                else:
+                    silent += 1
+                    if silent >= end_frames:
+                        break
+            return True
@@ -0,0 +1,122 @@
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+STARTING = "starting"
+CAN_GREET = "can_greet"
+READY = "ready"
+FAILED = "failed"
+
+
+class StartupOrchestrator:
+    def __init__(
+        self,
+        greeting_requires: Iterable[str] = (),
+        answering_requires: Iterable[str] = (),
+        max_workers: int = 4
+    ):
+        """
+        Runs the kiosk start-up tasks (model loading, index building, audio decoding,
+        microphone calibration, warm-up) in background threads.
+
+        Tasks are registered with `submit(name, fn, deps=...)`; a task starts as soon
+        as its dependencies have finished and receives their results as keyword
+        arguments. Heavy modules should be imported inside the task functions so
+        that importing the kiosk script itself stays fast.
+
+        Readiness:
+          - "can_greet": every task in `greeting_requires` finished
+          - "ready":     every task in `answering_requires` finished as well
+          - "failed":    a required task raised
+        """
+        self.greeting_requires = list(greeting_requires)
+        self.answering_requires = list(answering_requires)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+        self._futures: Dict[str, Future] = {}
+        self._timings: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def submit(self, name: str, fn: Callable, deps: Iterable[str] = ()) -> Future:
+        deps = list(deps)
+        for dep in deps:
+            if dep not in self._futures:
+                raise ValueError(f"Unknown dependency '{dep}' for task '{name}'. Submit it first.")
+
+        def run():
+            kwargs = {dep: self._futures[dep].result() for dep in deps}
+            start = time.perf_counter()
+            try:
+                return fn(**kwargs)
+            finally:
+                with self._lock:
+                    self._timings[name] = time.perf_counter() - start
+
+        with self._lock:
+            if name in self._futures:
+                raise ValueError(f"Task '{name}' already submitted.")
+            future = self._executor.submit(run)
+            self._futures[name] = future
+        return future
+
+    def result(self, name: str, timeout: Optional[float] = None):
+        """Block until the task finished and return its result (re-raises its exception)."""
+        return self._futures[name].result(timeout)
+
+    def is_done(self, name: str) -> bool:
+        future = self._futures.get(name)
+        return future is not None and future.done() and future.exception() is None
+
+    def wait(self, names: Iterable[str], timeout: Optional[float] = None) -> bool:
+        """Wait for the given tasks; returns False on timeout or if any of them failed."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in names:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                self._futures[name].result(remaining)
+            except Exception:
+                return False
+        return True
+
+    def wait_until_can_greet(self, timeout: Optional[float] = None) -> bool:
+        return self.wait(self.greeting_requires, timeout)
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        return self.wait(self.greeting_requires + self.answering_requires, timeout)
+
+    @property
+    def readiness(self) -> str:
+        required = self.greeting_requires + self.answering_requires
+        for name in required:
+            future = self._futures.get(name)
+            if future is not None and future.done() and future.exception() is not None:
+                return FAILED
+        if all(self.is_done(name) for name in required):
+            return READY
+        if all(self.is_done(name) for name in self.greeting_requires):
+            return CAN_GREET
+        return STARTING
+
+    def status(self) -> Dict[str, Dict]:
+        """Per-task state ("pending", "running", "done", "failed") and duration in seconds."""
+        status = {}
+        with self._lock:
+            timings = dict(self._timings)
+            futures = dict(self._futures)
+        for name, future in futures.items():
+            if not future.done():
+                state = "running" if future.running() else "pending"
+            else:
+                state = "failed" if future.exception() is not None else "done"
+            entry = {"state": state, "seconds": timings.get(name)}
+            if state == "failed":
+                entry["error"] = repr(future.exception())
+            status[name] = entry
+        return status
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
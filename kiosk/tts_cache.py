@@ -0,0 +1,192 @@
+import os
+import json
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_VOICE_ID = "f5AWG6Xu8Fw3JCFUVWkS"
+DEFAULT_MODEL_ID = "eleven_multilingual_v2"
+DEFAULT_OUTPUT_FORMAT = "mp3_44100_128"
+DEFAULT_VOICE_SETTINGS = {"stability": 0.7, "similarity_boost": 0.7}
+DEFAULT_PHRASES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixed_phrases.txt")
+
+
+def cache_key(text: str, voice_id: str, model_id: str, voice_settings: Optional[Dict], output_format: str) -> str:
+    payload = json.dumps(
+        [text, voice_id, model_id, voice_settings or {}, output_format],
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_phrases(path: str = DEFAULT_PHRASES_FILE) -> list[str]:
+    """One phrase per line; empty lines and lines starting with '#' are skipped."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+class TTSCache:
+    def __init__(self, cache_dir: str = os.path.join("audio", "tts_cache"), max_bytes: int = 500 * 1024 * 1024,
+                 memory_items: int = 32):
+        """
+        Persistent cache of synthesized speech keyed on
+        (text, voice_id, model_id, voice_settings, output_format).
+        Audio is stored as one file per key on disk, with the most recently used
+        entries also kept in memory. When the disk cache grows beyond `max_bytes`,
+        the least recently used files are evicted.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        # key -> size in least-recently-used order, rebuilt from file mtimes on disk
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        files = []
+        for name in os.listdir(cache_dir):
+            if name.endswith(".audio"):
+                path = os.path.join(cache_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-len(".audio")], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+        self._total_bytes = sum(self._entries.values())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".audio")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self._entries.move_to_end(key)
+                return audio
+            if key not in self._entries:
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    audio = f.read()
+                os.utime(path)  # keep the LRU order across restarts
+            except OSError:
+                self._total_bytes -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+            self._remember(key, audio)
+            return audio
+
+    def put(self, key: str, audio: bytes):
+        with self._lock:
+            path = self._path(key)
+            tmp_path = path + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(audio)
+                os.replace(tmp_path, path)  # readers never see a half-written file
+            except OSError as e:
+                print("Błąd przy zapisie do pamięci podręcznej mowy:", e)
+                return
+            self._total_bytes += len(audio) - self._entries.pop(key, 0)
+            self._entries[key] = len(audio)
+            self._remember(key, audio)
+            self._evict()
+
+    def _remember(self, key: str, audio: bytes):
+        self._memory[key] = audio
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._memory.pop(key, None)
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def synthesize(
+        self,
+        client,
+        text: str,
+        voice_id: str = DEFAULT_VOICE_ID,
+        model_id: str = DEFAULT_MODEL_ID,
+        output_format: str = DEFAULT_OUTPUT_FORMAT,
+        voice_settings: Optional[Dict] = None
+    ) -> Tuple[bytes, bool]:
+        """
+        Return (audio, cache_hit). On a miss the text is synthesized with the
+        ElevenLabs client and stored; on a hit no API call is made.
+        """
+        # The key and the API call must see the same text.
+        text = text.strip()
+        if voice_settings is None:
+            voice_settings = DEFAULT_VOICE_SETTINGS
+        key = cache_key(text, voice_id, model_id, voice_settings, output_format)
+        audio = self.get(key)
+        if audio is not None:
+            self.hits += 1
+            return audio, True
+        self.misses += 1
+        audio = b"".join(client.text_to_speech.convert(
+            text=text,
+            voice_id=voice_id,
+            model_id=model_id,
+            output_format=output_format,
+            voice_settings=voice_settings
+        ))
+        self.put(key, audio)
+        return audio, False
+
+    def presynthesize(self, client, phrases: Iterable[str], **tts_options) -> int:
+        """Synthesize every phrase not cached yet; returns the number of API calls made."""
+        synthesized = 0
+        for phrase in phrases:
+            try:
+                _, hit = self.synthesize(client, phrase, **tts_options)
+            except Exception as e:
+                print(f"Błąd przy generowaniu mowy dla '{phrase}': {e}")
+                continue
+            synthesized += not hit
+        return synthesized
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-synthesize fixed phrases into the TTS cache')
+    parser.add_argument('--phrases', type=str, default=DEFAULT_PHRASES_FILE, help='File with one phrase per line')
+    parser.add_argument('--cache-dir', type=str, default=os.path.join("audio", "tts_cache"))
+    parser.add_argument('--voice-id', type=str, default=DEFAULT_VOICE_ID)
+    args = parser.parse_args()
+
+    api_key = os.getenv("ELEVENLABS_API_KEY")
+    if not api_key:
+        print("Error: ELEVENLABS_API_KEY environment variable not set")
+        return 1
+    from elevenlabs.client import ElevenLabs
+
+    cache = TTSCache(cache_dir=args.cache_dir)
+    phrases = load_phrases(args.phrases)
+    synthesized = cache.presynthesize(ElevenLabs(api_key=api_key), phrases, voice_id=args.voice_id)
+    print(f"{len(phrases)} phrases, {synthesized} newly synthesized, "
+          f"cache holds {len(cache)} entries ({cache.total_bytes / 1e6:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,257 @@
+import os
+import json
+import glob
+import time
+import queue
+import threading
+from datetime import datetime, date
+from typing import Dict, Iterator, List, Optional
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+class InteractionLogger:
+    def __init__(
+        self,
+        log_dir: str = "logs",
+        prefix: str = "interactions",
+        max_bytes: int = 50 * 1024 * 1024,
+        flush_interval: float = 1.0,
+        fsync_policy: str = "interval",
+        max_queue_size: int = 10000
+    ):
+        """
+        Append-only JSONL logger for Q/A interactions.
+        Records are queued by `log` and written by a background thread, so the
+        voice loop never waits on disk. Segments are named
+        `<prefix>_YYYYMMDD_NNN.jsonl` and rotate when the day changes or a
+        segment grows beyond `max_bytes`.
+
+        fsync_policy:
+          - "always":   fsync after every batch of records
+          - "interval": fsync at most once per `flush_interval` seconds
+          - "never":    leave it to the OS
+        """
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync_policy}. Use one of {FSYNC_POLICIES}.")
+        self.log_dir = log_dir
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self.dropped = 0          # records rejected because the queue was full
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._file = None
+        self._file_day = None
+        self._file_path = None
+        self._last_fsync = 0.0
+        self._closed = False
+
+        os.makedirs(log_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="interaction-log", daemon=True)
+        self._thread.start()
+
+    def log(self, entry: Dict) -> bool:
+        """
+        Queue a record for writing. Never blocks; returns False if the record
+        was dropped because the queue is full or the logger is closed.
+        """
+        if self._closed:
+            return False
+        record = dict(entry)
+        record.setdefault("timestamp", datetime.now().isoformat())
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every record queued so far has been written to disk."""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Flush pending records, fsync and stop the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    @property
+    def current_path(self) -> Optional[str]:
+        return self._file_path
+
+    def __enter__(self) -> "InteractionLogger":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._sync(force=False)
+                continue
+
+            # Drain whatever else is waiting so one write/flush covers a whole batch.
+            batch = [item]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            waiters = []
+            for item in batch:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    self._write(item)
+
+            self._sync(force=bool(waiters) or stop)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write(self, record: Dict):
+        try:
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+        except (TypeError, ValueError) as e:
+            line = json.dumps({"timestamp": record.get("timestamp"), "log_error": str(e)}) + "\n"
+        data = line.encode("utf-8")
+        try:
+            self._rotate_if_needed(len(data))
+            self._file.write(data)
+        except OSError as e:
+            print("Błąd przy zapisywaniu logu:", e)
+
+    def _sync(self, force: bool):
+        if self._file is None:
+            return
+        try:
+            self._file.flush()
+            if self.fsync_policy == "never":
+                return
+            now = time.monotonic()
+            if force or self.fsync_policy == "always" or now - self._last_fsync >= self.flush_interval:
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+        except OSError as e:
+            print("Błąd przy zapisywaniu logu:", e)
+
+    def _rotate_if_needed(self, incoming: int):
+        today = date.today()
+        if self._file is not None:
+            if self._file_day == today and self._file.tell() + incoming <= self.max_bytes:
+                return
+            self._sync(force=True)
+            self._file.close()
+            self._file = None
+        self._file_path = self._next_segment_path(today)
+        self._file = open(self._file_path, "ab")
+        self._file_day = today
+        if self._file.tell() > 0:
+            # Terminate a line cut short by a crash so it does not swallow the next record.
+            with open(self._file_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write(b"\n")
+
+    def _next_segment_path(self, day: date) -> str:
+        day_str = day.strftime("%Y%m%d")
+        existing = sorted(glob.glob(os.path.join(self.log_dir, f"{self.prefix}_{day_str}_*.jsonl")))
+        if existing:
+            # Continue the last segment of the day if it still has room.
+            last = existing[-1]
+            if self._file_path != last and os.path.getsize(last) < self.max_bytes:
+                return last
+            seq = int(os.path.splitext(last)[0].rsplit("_", 1)[1]) + 1
+        else:
+            seq = 0
+        return os.path.join(self.log_dir, f"{self.prefix}_{day_str}_{seq:03d}.jsonl")
+
+
+def list_segments(log_dir: str = "logs", prefix: str = "interactions") -> List[str]:
+    """Return all log segments in chronological order."""
+    return sorted(glob.glob(os.path.join(log_dir, f"{prefix}_*_*.jsonl")))
+
+
+def read_interactions(
+    log_dir: str = "logs",
+    prefix: str = "interactions",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Iterator[Dict]:
+    """
+    Iterate over logged records in chronological order, optionally limited to
+    the [since, until) time range. A truncated last line (e.g. after a power
+    cut) is skipped instead of aborting the read.
+    """
+    for path in list_segments(log_dir, prefix):
+        day_str = os.path.basename(path)[len(prefix) + 1:].split("_", 1)[0]
+        try:
+            day = datetime.strptime(day_str, "%Y%m%d").date()
+        except ValueError:
+            continue
+        if since is not None and day < since.date():
+            continue
+        if until is not None and day > until.date():
+            continue
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if since is not None or until is not None:
+                    try:
+                        ts = datetime.fromisoformat(record.get("timestamp", ""))
+                    except (TypeError, ValueError):
+                        continue
+                    if since is not None and ts < since:
+                        continue
+                    if until is not None and ts >= until:
+                        continue
+                yield record
+
+
+def summarize_latencies(records: Iterator[Dict]) -> Dict[str, Dict[str, float]]:
+    """
+    Aggregate the per-stage `latencies` of the given records into
+    count/mean/p50/p95/max (seconds) per stage.
+    """
+    per_stage: Dict[str, List[float]] = {}
+    for record in records:
+        for stage, value in (record.get("latencies") or {}).items():
+            per_stage.setdefault(stage, []).append(float(value))
+    summary = {}
+    for stage, values in per_stage.items():
+        values.sort()
+        n = len(values)
+        summary[stage] = {
+            "count": n,
+            "mean": sum(values) / n,
+            "p50": values[int(0.50 * (n - 1))],
+            "p95": values[int(0.95 * (n - 1))],
+            "max": values[-1],
+        }
+    return summary
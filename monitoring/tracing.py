@@ -0,0 +1,215 @@
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Optional
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RollingHistogram:
+    def __init__(self, window: int = 1000):
+        """
+        Keeps the last `window` samples of a stage for rolling quantiles,
+        plus all-time count and sum for Prometheus-style counters.
+        """
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        with self._lock:
+            self._samples.append(value)
+            self.count += 1
+            self.total += value
+
+    def quantiles(self, qs: Iterable[float] = DEFAULT_QUANTILES) -> Dict[float, float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {q: 0.0 for q in qs}
+        n = len(samples)
+        return {q: samples[min(n - 1, int(q * n))] for q in qs}
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer: "Tracer", name: str):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Tracer:
+    def __init__(self, enabled: bool = True, window: int = 1000):
+        """
+        Lightweight span timer for the voice loop.
+        `span(name)` times a block and feeds a per-stage rolling histogram.
+        When disabled, `span` returns a shared no-op context manager, so the
+        instrumented code pays only for one attribute check.
+        """
+        self.enabled = enabled
+        self.window = window
+        self._histograms: Dict[str, RollingHistogram] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def span(self, name: str):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, name)
+
+    def record(self, name: str, seconds: float):
+        """Record an externally measured duration for a stage."""
+        if not self.enabled:
+            return
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, RollingHistogram(self.window))
+        histogram.observe(seconds)
+        turn = getattr(self._local, "turn", None)
+        if turn is not None:
+            turn[name] = turn.get(name, 0.0) + seconds
+
+    def start_turn(self) -> Dict[str, float]:
+        """
+        Start collecting the durations of all spans closed in this thread,
+        e.g. to attach per-stage latencies to one Q/A log record.
+        Returns the dict that is filled until `end_turn` is called.
+        """
+        latencies: Dict[str, float] = {}
+        self._local.turn = latencies
+        return latencies
+
+    def end_turn(self) -> Dict[str, float]:
+        latencies = getattr(self._local, "turn", None) or {}
+        self._local.turn = None
+        return latencies
+
+    @contextmanager
+    def turn(self):
+        """Context-manager form of `start_turn`/`end_turn`."""
+        latencies = self.start_turn()
+        try:
+            yield latencies
+        finally:
+            self.end_turn()
+
+    def snapshot(self, qs: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, Dict]:
+        """Return count, sum and rolling quantiles (seconds) per stage."""
+        with self._lock:
+            items = list(self._histograms.items())
+        snapshot = {}
+        for name, histogram in sorted(items):
+            snapshot[name] = {
+                "count": histogram.count,
+                "sum": histogram.total,
+                "quantiles": {str(q): v for q, v in histogram.quantiles(qs).items()},
+            }
+        return snapshot
+
+    def render_prometheus(self, metric: str = "artchat_stage_latency_seconds") -> str:
+        """Render the histograms in the Prometheus text exposition format (as summaries)."""
+        lines = [
+            f"# HELP {metric} Latency of voice loop stages (rolling window quantiles).",
+            f"# TYPE {metric} summary",
+        ]
+        for name, stats in self.snapshot().items():
+            for q, value in stats["quantiles"].items():
+                lines.append(f'{metric}{{stage="{name}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {stats["sum"]:.6f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {stats["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+
+# Shared tracer used by the chatbot, the RAG system and the chat module.
+tracer = Tracer()
+
+
+def start_metrics_server(
+    host: str = "127.0.0.1",
+    port: int = 9464,
+    source: Optional[Tracer] = None,
+    health: Optional[Callable[[], Dict]] = None
+) -> ThreadingHTTPServer:
+    """
+    Serve `/metrics` (Prometheus text) and `/metrics.json` from a daemon thread.
+    If `health` is given, its result is served as JSON at `/health`.
+    Returns the server; call `shutdown()` on it to stop.
+    """
+    source = source or tracer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = source.render_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/metrics.json":
+                body = json.dumps(source.snapshot(), indent=2).encode("utf-8")
+                content_type = "application/json"
+            elif self.path == "/health" and health is not None:
+                body = json.dumps(health(), ensure_ascii=False, indent=2).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # keep the kiosk console clean
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
+
+
+def start_periodic_dump(path: str, interval: float = 60.0, source: Optional[Tracer] = None) -> threading.Event:
+    """
+    Periodically overwrite `path` with a JSON snapshot of the histograms.
+    Returns an Event; set it to stop dumping.
+    """
+    source = source or tracer
+    stop = threading.Event()
+
+    def _dump_loop():
+        while not stop.wait(interval):
+            try:
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(source.snapshot(), f, indent=2)
+            except OSError as e:
+                print("Błąd przy zapisywaniu metryk:", e)
+
+    threading.Thread(target=_dump_loop, name="metrics-dump", daemon=True).start()
+    return stop
@@ -12,6 +12,8 @@ def pdf_to_text(pdf_path, txt_path):
             page = pdf_document.load_page(page_number)
             text = page.get_text()
             text_file.write(text)
+            # Form feed marks the page break, so chunks can carry page numbers
+            text_file.write("\f")
     
     # Close the PDF
     pdf_document.close()
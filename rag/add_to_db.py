@@ -1,14 +1,45 @@
+# Run from the repository root: python -m rag.add_to_db <path>
+import os
+import json
 import argparse
 from pathlib import Path
+
+import faiss
 from tqdm import tqdm
-from database import PolishRAGSystem
+
+from rag.database import PolishRAGSystem, ENCODER_PRECISIONS, INDEX_TYPES
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.json"
 
 
 def read_text_file(file_path: str) -> str:
-    with open(file_path, 'r') as file:
+    with open(file_path, 'r', encoding='utf-8') as file:
         return file.read()
 
 
+def load_database(rag_system, db_dir: str) -> bool:
+    """Load a previously saved index with its chunks and metadata; False if there is none."""
+    index_path = os.path.join(db_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return False
+    rag_system.index = faiss.read_index(index_path)
+    rag_system.dimension = rag_system.index.d
+    with open(os.path.join(db_dir, CHUNKS_FILE), encoding='utf-8') as f:
+        saved = json.load(f)
+    rag_system.documents = saved["documents"]
+    rag_system.metadata = saved["metadata"]
+    return True
+
+
+def save_database(rag_system, db_dir: str):
+    """Save the FAISS index and the chunks/metadata stored under its ids."""
+    os.makedirs(db_dir, exist_ok=True)
+    faiss.write_index(rag_system.index, os.path.join(db_dir, INDEX_FILE))
+    with open(os.path.join(db_dir, CHUNKS_FILE), 'w', encoding='utf-8') as f:
+        json.dump({"documents": rag_system.documents, "metadata": rag_system.metadata}, f, ensure_ascii=False)
+
+
 def process_files(rag_system, path: Path, recursive: bool, batch_size: int):
     # Collect files to process
     if path.is_file():
@@ -29,29 +60,40 @@ def process_files(rag_system, path: Path, recursive: bool, batch_size: int):
     # Process files in batches
     documents = []
     metadata_list = []
-    stats = {'processed': 0, 'total': len(files)}
+    pending_files = 0
+    stats = {'processed': 0, 'failed': 0, 'total': len(files)}
+
+    def add_batch():
+        # A failed batch is dropped, not retried with the next files.
+        try:
+            rag_system.add_documents(documents, metadata_list)
+            stats['processed'] += pending_files
+        except Exception as e:
+            print(f"Error adding a batch of {pending_files} files: {str(e)}")
+            stats['failed'] += pending_files
 
     for i, file_path in enumerate(tqdm(files, desc="Processing files")):
         try:
             content = read_text_file(str(file_path))
-            metadata = {
-                'filename': file_path.name,
-            }
-
-            documents.append(content)
-            metadata_list.append(metadata)
-            stats['processed'] += 1
-
-            if len(documents) >= batch_size:
-                rag_system.add_documents(documents, metadata_list)
-                documents = []
-                metadata_list = []
-
+            # Chunks with source/page/language/section metadata
+            chunks, chunk_metadata = rag_system.chunk_document(content, file_path.name)
         except Exception as e:
             print(f"Error processing {file_path}: {str(e)}")
+            stats['failed'] += 1
+            continue
+
+        documents.extend(chunks)
+        metadata_list.extend(chunk_metadata)
+        pending_files += 1
+
+        if pending_files >= batch_size:
+            add_batch()
+            documents = []
+            metadata_list = []
+            pending_files = 0
 
     if documents:
-        rag_system.add_documents(documents, metadata_list)
+        add_batch()
 
     return stats
 
@@ -59,12 +101,14 @@ def process_files(rag_system, path: Path, recursive: bool, batch_size: int):
 def main():
     parser = argparse.ArgumentParser(description='Process text files for Polish RAG system')
     parser.add_argument('path', type=str, help='Path to file or directory to process')
-    parser.add_argument('--collection', type=str, default='polish_documents',
-                        help='Name of the ChromaDB collection')
-    parser.add_argument('--db-dir', type=str, default='./chroma_db',
-                        help='Directory for ChromaDB storage')
+    parser.add_argument('--db-dir', type=str, default='./faiss_db',
+                        help='Directory of the FAISS index and its chunks; added to if it exists')
+    parser.add_argument('--model-name', type=str, default='sentence-transformers/all-MiniLM-L6-v2')
+    parser.add_argument('--encoder-precision', type=str, default='fp32', choices=ENCODER_PRECISIONS)
+    parser.add_argument('--index-type', type=str, default='flat', choices=INDEX_TYPES,
+                        help='FAISS vector storage for a new index')
     parser.add_argument('--batch-size', type=int, default=10,
-                        help='Number of files to process before persisting')
+                        help='Number of files to chunk and encode per add_documents call')
     parser.add_argument('--no-recursive', action='store_false', dest='recursive',
                         help='Do not recursively process subdirectories')
 
@@ -72,9 +116,12 @@ def main():
 
     # Initialize RAG system
     rag = PolishRAGSystem(
-        collection_name=args.collection,
-        persist_directory=args.db_dir
+        model_name=args.model_name,
+        encoder_precision=args.encoder_precision,
+        index_type=args.index_type
     )
+    if load_database(rag, args.db_dir):
+        print(f"Loaded {len(rag.documents)} chunks from {args.db_dir}")
 
     # Process files
     path = Path(args.path)
@@ -85,9 +132,13 @@ def main():
             recursive=args.recursive,
             batch_size=args.batch_size
         )
+        if rag.index is not None:
+            save_database(rag, args.db_dir)
         print(f"\nProcessing complete. Statistics:")
         print(f"Total files: {stats['total']}")
         print(f"Successfully processed: {stats['processed']}")
+        print(f"Failed: {stats['failed']}")
+        print(f"Chunks in {args.db_dir}: {len(rag.documents)}")
 
     except Exception as e:
         print(f"Error: {str(e)}")
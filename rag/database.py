@@ -1,8 +1,64 @@
 import os
+import re
 import faiss
+import numpy as np
 import torch
 from sentence_transformers import SentenceTransformer, CrossEncoder
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from monitoring.tracing import tracer
+
+ENCODER_PRECISIONS = ("fp32", "int8", "onnx", "onnx-int8")
+INDEX_TYPES = ("flat", "fp16", "sq8")
+# Pre-quantized ONNX export shipped in the sentence-transformers model repositories.
+ONNX_INT8_FILE = "onnx/model_qint8_avx2.onnx"
+
+POLISH_MARKERS = set("ąćęłńóśźż")
+POLISH_STOPWORDS = {"i", "w", "na", "z", "się", "nie", "jest", "że", "do", "to", "jak", "oraz", "przez", "dla"}
+ENGLISH_STOPWORDS = {"the", "and", "of", "to", "in", "is", "that", "for", "with", "as", "was", "on", "by", "are"}
+HEADING_END_PUNCTUATION = ".,;:!?"
+
+
+def detect_language(text: str) -> str:
+    """Cheap "pl"/"en" guess from diacritics and stopwords, good enough for filtering."""
+    words = re.findall(r"\w+", text.lower()[:5000])
+    polish = sum(w in POLISH_STOPWORDS for w in words) + sum(c in POLISH_MARKERS for c in text[:5000])
+    english = sum(w in ENGLISH_STOPWORDS for w in words)
+    return "pl" if polish >= english else "en"
+
+
+def is_heading(line: str) -> bool:
+    """Short capitalised line without sentence punctuation, e.g. a chapter or artist name."""
+    words = line.split()
+    return (
+        0 < len(words) <= 10
+        and len(line) <= 80
+        and line[0].isupper()
+        and line[-1] not in HEADING_END_PUNCTUATION
+        and any(c.isalpha() for c in line)
+    )
+
+
+def load_encoder(model_name: str, device: str = "cpu", precision: str = "fp32") -> SentenceTransformer:
+    """
+    Load the sentence encoder at the requested precision:
+      - "fp32":      regular PyTorch model
+      - "int8":      PyTorch dynamic int8 quantization of all Linear layers
+      - "onnx":      ONNX Runtime backend (needs sentence-transformers[onnx])
+      - "onnx-int8": ONNX Runtime with the pre-quantized int8 export
+    The quantized variants are CPU-only.
+    """
+    if precision not in ENCODER_PRECISIONS:
+        raise ValueError(f"Unknown encoder precision: {precision}. Use one of {ENCODER_PRECISIONS}.")
+    if precision == "fp32":
+        return SentenceTransformer(model_name, device=device)
+    if precision == "int8":
+        model = SentenceTransformer(model_name, device="cpu")
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if precision == "onnx":
+        return SentenceTransformer(model_name, device="cpu", backend="onnx")
+    return SentenceTransformer(model_name, device="cpu", backend="onnx",
+                               model_kwargs={"file_name": ONNX_INT8_FILE})
+
 
 class PolishRAGSystem:
     def __init__(
@@ -10,18 +66,32 @@ class PolishRAGSystem:
         data_folder: str = None,
         model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
         chunk_max_size: int = 5000,
-        chunk_overlap: int = 200
+        chunk_overlap: int = 200,
+        model=None,
+        encoder_precision: str = "fp32",
+        index_type: str = "flat"
     ):
         """
         Initialize the FAISS‑based RAG system with document chunking.
         If a data folder is provided, all .txt files in that folder will be loaded,
         chunked, and added to the FAISS index.
+        An already loaded encoder can be passed as `model` instead of loading `model_name`.
+
+        encoder_precision: "fp32", "int8", "onnx" or "onnx-int8" (see load_encoder)
+        index_type:        how vectors are stored in FAISS
+                             - "flat": float32, exact (4 bytes per dimension)
+                             - "fp16": half precision (2 bytes per dimension)
+                             - "sq8":  8-bit scalar quantization (1 byte per dimension),
+                                       trained on the first batch of embeddings
         """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {index_type}. Use one of {INDEX_TYPES}.")
         self.device = "cpu"  # "cuda" if torch.cuda.is_available() else "cpu"
-        self.model = SentenceTransformer(model_name, device=self.device)
+        self.model = model if model is not None else load_encoder(model_name, self.device, encoder_precision)
+        self.index_type = index_type
         self.index = None         # FAISS index
         self.documents = []       # list of document chunks
-        self.metadata = []        # corresponding metadata (e.g. filename) per chunk
+        self.metadata = []        # per chunk: filename, source, page, language, section
         self.dimension = None
         self.chunk_max_size = chunk_max_size
         self.chunk_overlap = chunk_overlap
@@ -33,6 +103,8 @@ class PolishRAGSystem:
                 for f in os.listdir(data_folder)
                 if f.endswith(".txt")
             ]
+            documents = []
+            metadata_list = []
             for file in text_files:
                 try:
                     with open(file, encoding="utf-8") as f:
@@ -41,12 +113,11 @@ class PolishRAGSystem:
                     print(f"Error reading {file}: {e}")
                     continue
                 # Split the content into overlapping chunks
-                chunks = self.split_text(content, chunk_max_size, chunk_overlap)
-                for chunk in chunks:
-                    self.documents.append(chunk)
-                    self.metadata.append({"filename": os.path.basename(file)})
+                chunks, chunk_metadata = self.chunk_document(content, os.path.basename(file))
+                documents.extend(chunks)
+                metadata_list.extend(chunk_metadata)
             # Add all chunks to the FAISS index
-            self.add_documents(self.documents, self.metadata)
+            self.add_documents(documents, metadata_list)
 
     def split_text(self, text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
         """
@@ -55,27 +126,70 @@ class PolishRAGSystem:
         This is a simple implementation (token-based) and can be improved if needed.
         """
         tokens = text.split()
-        chunks = []
-        current_chunk = []
+        return [" ".join(tokens[start:end]) for start, end in self._chunk_spans(tokens, chunk_size, chunk_overlap)]
+
+    def _chunk_spans(self, tokens: List[str], chunk_size: int, chunk_overlap: int) -> List[Tuple[int, int]]:
+        """Token index ranges [start, end) of the chunks produced by split_text."""
+        spans = []
+        start = 0
         current_length = 0
-        for token in tokens:
+        for i, token in enumerate(tokens):
             token_length = len(token) + 1  # approximate length including a space
-            if current_length + token_length > chunk_size and current_chunk:
-                chunk = " ".join(current_chunk)
-                chunks.append(chunk)
-                # Create overlap: take last chunk_overlap tokens (if available)
-                overlap = current_chunk[-chunk_overlap:] if len(current_chunk) > chunk_overlap else current_chunk
-                current_chunk = overlap.copy()
-                current_length = sum(len(t) + 1 for t in current_chunk)
-            current_chunk.append(token)
+            if current_length + token_length > chunk_size and i > start:
+                spans.append((start, i))
+                # Create overlap: keep the last chunk_overlap tokens (if available)
+                if i - start > chunk_overlap:
+                    start = i - chunk_overlap
+                current_length = sum(len(t) + 1 for t in tokens[start:i])
             current_length += token_length
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
-        return chunks
+        if start < len(tokens):
+            spans.append((start, len(tokens)))
+        return spans
+
+    def chunk_document(self, content: str, filename: str) -> Tuple[List[str], List[Dict]]:
+        """
+        Split one document into chunks with structured metadata:
+          - filename: file name, as before
+          - source:   document name without extension
+          - page:     1-based page of the chunk start if the text has form-feed page
+                      breaks (as written by processing/better_pdf_to_txt.py), else None
+          - language: "pl" or "en" (see detect_language)
+          - section:  closest heading line before the chunk start, or None
+        """
+        tokens = []
+        token_pages = []
+        token_sections = []
+        has_pages = "\f" in content
+        section = None
+        for page_number, page in enumerate(content.split("\f"), 1):
+            for line in page.splitlines():
+                line = line.strip()
+                if is_heading(line):
+                    section = line
+                line_tokens = line.split()
+                tokens.extend(line_tokens)
+                token_pages.extend([page_number] * len(line_tokens))
+                token_sections.extend([section] * len(line_tokens))
+
+        source = os.path.splitext(filename)[0]
+        language = detect_language(content)
+        chunks = []
+        metadata_list = []
+        for start, end in self._chunk_spans(tokens, self.chunk_max_size, self.chunk_overlap):
+            chunks.append(" ".join(tokens[start:end]))
+            metadata_list.append({
+                "filename": filename,
+                "source": source,
+                "page": token_pages[start] if has_pages else None,
+                "language": language,
+                "section": token_sections[start],
+            })
+        return chunks, metadata_list
 
     def add_documents(self, documents: List[str], metadata_list: List[Dict] = None):
         """
         Compute embeddings for the given documents (chunks) and add them to the FAISS index.
+        The chunks and their metadata are stored under the ids FAISS assigns to them.
         """
         if metadata_list is None:
             metadata_list = [{} for _ in documents]
@@ -84,25 +198,78 @@ class PolishRAGSystem:
             self.dimension = embeddings.shape[1]
         # Create FAISS index if it does not exist
         if self.index is None:
-            if self.device == "cuda":
-                res = faiss.StandardGpuResources()
-                cpu_index = faiss.IndexFlatL2(self.dimension)
-                self.index = faiss.index_cpu_to_gpu(res, 0, cpu_index)
-            else:
-                self.index = faiss.IndexFlatL2(self.dimension)
+            self.index = self._create_index()
+        if not self.index.is_trained:
+            # Scalar quantizers learn per-dimension value ranges from the first batch.
+            self.index.train(embeddings)
         # Add embeddings to the index
         self.index.add(embeddings)
+        # Only after a successful add, so the lists stay aligned with the FAISS ids.
+        self.documents.extend(documents)
+        self.metadata.extend(metadata_list)
 
-    def search(self, query: str, top_k: int = 5, include_metadata: bool = True) -> List[Dict]:
+    def _create_index(self):
+        if self.index_type == "fp16":
+            return faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+        if self.index_type == "sq8":
+            return faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+        if self.device == "cuda":
+            res = faiss.StandardGpuResources()
+            cpu_index = faiss.IndexFlatL2(self.dimension)
+            return faiss.index_cpu_to_gpu(res, 0, cpu_index)
+        return faiss.IndexFlatL2(self.dimension)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        include_metadata: bool = True,
+        filters: Optional[Dict] = None,
+        diversify: bool = False,
+        candidates: Optional[int] = None,
+        mmr_lambda: float = 0.5,
+        max_per_source: Optional[int] = None
+    ) -> List[Dict]:
         """
         Search for the top_k document chunks that are most similar to the query.
-        Returns a list of dictionaries containing the text, similarity score, and metadata.
+        Returns a list of dictionaries containing the chunk id, text, similarity score, and metadata.
+
+        filters:        metadata constraints applied inside the FAISS search, e.g.
+                        {"language": "pl", "source": ["katalog", "kronika"]}. A value may be
+                        a single value, a list/set of allowed values, or a predicate.
+        diversify:      pick the top_k from `candidates` nearest chunks with Maximal
+                        Marginal Relevance, so overlapping windows of the same text are
+                        not all returned. `mmr_lambda` trades relevance (1.0) for novelty (0.0).
+        max_per_source: cap on chunks from one source document in the result; if the
+                        candidates come from too few sources, the remaining slots are
+                        filled anyway, so top_k results are returned whenever possible.
         """
-        query_embedding = self.model.encode([query], convert_to_numpy=True)
-        distances, indices = self.index.search(query_embedding, top_k)
+        with tracer.span("encode_query"):
+            query_embedding = self.model.encode([query], convert_to_numpy=True)
+        n_candidates = top_k
+        if diversify or max_per_source is not None:
+            n_candidates = candidates or max(4 * top_k, 20)
+        params = None
+        if filters:
+            allowed_ids = self._filter_ids(filters)
+            if len(allowed_ids) == 0:
+                return []
+            params = faiss.SearchParameters()
+            params.sel = faiss.IDSelectorBatch(allowed_ids)
+        with tracer.span("faiss_search"):
+            distances, indices = self.index.search(query_embedding, n_candidates, params=params)
+
+        hits = [(d, idx) for d, idx in zip(distances[0], indices[0]) if idx >= 0]  # FAISS pads with -1
+        if diversify:
+            with tracer.span("mmr"):
+                hits = self._mmr(query_embedding[0], hits, top_k, mmr_lambda, max_per_source)
+        elif max_per_source is not None:
+            hits = self._cap_per_source(hits, top_k, max_per_source)
+
         results = []
-        for d, idx in zip(distances[0], indices[0]):
+        for d, idx in hits[:top_k]:
             result = {
+                'id': int(idx),
                 'text': self.documents[idx],
                 'similarity_score': 1 - d  # Note: d is an L2 distance; you may adjust this conversion.
             }
@@ -111,6 +278,87 @@ class PolishRAGSystem:
             results.append(result)
         return results
 
+    def _filter_ids(self, filters: Dict) -> np.ndarray:
+        """Ids of the chunks whose metadata satisfies every filter."""
+        checks = []
+        for field, expected in filters.items():
+            if callable(expected):
+                checks.append((field, expected))
+            elif isinstance(expected, (list, tuple, set, frozenset)):
+                allowed = set(expected)
+                checks.append((field, allowed.__contains__))
+            else:
+                checks.append((field, lambda value, expected=expected: value == expected))
+        ids = [
+            i for i, meta in enumerate(self.metadata)
+            if all(check(meta.get(field)) for field, check in checks)
+        ]
+        return np.array(ids, dtype=np.int64)
+
+    def _source(self, idx: int):
+        return self.metadata[idx].get("source", self.metadata[idx].get("filename"))
+
+    def _cap_per_source(self, hits: List[Tuple], top_k: int, max_per_source: int) -> List[Tuple]:
+        """
+        Keep at most `max_per_source` hits per source; if that leaves fewer than
+        top_k, the free slots are filled with the best skipped hits.
+        """
+        counts = {}
+        kept = []
+        skipped = []
+        for d, idx in hits:
+            source = self._source(idx)
+            if counts.get(source, 0) < max_per_source:
+                counts[source] = counts.get(source, 0) + 1
+                kept.append((d, idx))
+                if len(kept) == top_k:
+                    return kept
+            else:
+                skipped.append((d, idx))
+        return sorted(kept + skipped[:top_k - len(kept)], key=lambda hit: hit[0])
+
+    def _mmr(self, query_embedding: np.ndarray, hits: List[Tuple], top_k: int, mmr_lambda: float,
+             max_per_source: Optional[int] = None) -> List[Tuple]:
+        """
+        Maximal Marginal Relevance over the candidate hits, using the vectors
+        already stored in the index (no re-encoding of the candidate texts).
+        """
+        if len(hits) <= 1:
+            return self._cap_per_source(hits, top_k, max_per_source) if max_per_source is not None else hits[:top_k]
+        ids = np.array([idx for _, idx in hits], dtype=np.int64)
+        vectors = self.index.reconstruct_batch(ids)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        query = query_embedding / max(np.linalg.norm(query_embedding), 1e-12)
+        relevance = vectors @ query
+        pairwise = vectors @ vectors.T
+
+        selected = []
+        counts = {}
+        capped = []  # candidates skipped because their source was full
+        max_similarity = np.full(len(hits), -np.inf)
+        remaining = list(range(len(hits)))
+        while len(selected) < top_k:
+            if not remaining:
+                if not capped:
+                    break
+                # Too few sources among the candidates: fill the free slots
+                # with the skipped ones rather than returning fewer than top_k.
+                remaining, capped, max_per_source = capped, [], None
+            if selected:
+                scores = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * max_similarity[remaining]
+            else:
+                scores = relevance[remaining]
+            best = remaining.pop(int(np.argmax(scores)))
+            if max_per_source is not None:
+                source = self._source(hits[best][1])
+                if counts.get(source, 0) >= max_per_source:
+                    capped.append(best)
+                    continue
+                counts[source] = counts.get(source, 0) + 1
+            selected.append(best)
+            max_similarity = np.maximum(max_similarity, pairwise[best])
+        return [hits[i] for i in selected]
+
     def load_reranker(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-12-v2") -> "PolishRAGSystem":
         """
         Load a cross‑encoder model for reranking search results.
@@ -127,7 +375,8 @@ class PolishRAGSystem:
             raise ValueError("Reranker model is not loaded. Call load_reranker() first.")
         # Prepare (query, document) pairs for scoring
         pairs = [(query, result['text']) for result in results]
-        scores = self.reranker.predict(pairs)
+        with tracer.span("rerank"):
+            scores = self.reranker.predict(pairs)
         # Combine results with their scores and sort in descending order
         scored_results = list(zip(results, scores))
         scored_results.sort(key=lambda x: x[1], reverse=True)